@@ -0,0 +1,117 @@
+# HTTP client for the Streamlit patient UI
+#
+# Streamlit reruns the whole script on every interaction, so the requests.Session
+# (and its keep-alive connection pool) is kept in st.cache_resource and survives
+# reruns, and reads are cached with st.cache_data until a write invalidates them.
+import os
+from typing import Optional
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Set the FastAPI base URL
+BASE_URL = os.environ.get('PATIENTS_API_URL', 'http://127.0.0.1:8000')
+# How long cached reads may be served before refetching, in seconds
+READ_TTL_SECONDS = int(os.environ.get('PATIENTS_UI_CACHE_TTL', '30'))
+# Patients fetched per page on the list views
+PAGE_SIZE = 25
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 10)
+
+
+class APIError(Exception):
+    """
+    Non-success response from the patient API, carrying its status code and detail message.
+    """
+
+    def __init__(self, response: requests.Response):
+        try:
+            detail = response.json().get('detail', response.text)
+        except ValueError:
+            detail = response.text
+        super().__init__(f'{response.status_code}: {detail}')
+        self.status_code = response.status_code
+        self.detail = detail
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    One pooled session per Streamlit server process, shared by every rerun and browser tab.
+    Idempotent reads are retried on connection errors and 502/503/504.
+    """
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], allowed_methods=['GET'])
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _get(path: str, params: Optional[dict] = None) -> dict:
+    response = get_session().get(f'{BASE_URL}{path}', params=params, timeout=TIMEOUT)
+    if response.status_code != 200:
+        raise APIError(response)
+    return response.json()
+
+
+# --------- Cached reads ---------
+@st.cache_data(ttl=READ_TTL_SECONDS, show_spinner=False)
+def fetch_page(cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> dict:
+    """
+    One page of patients in ID order: {'patients': {id: record}, 'next_cursor': ...}.
+    """
+    return _get('/view', {'limit': limit, 'cursor': cursor})
+
+
+@st.cache_data(ttl=READ_TTL_SECONDS, show_spinner=False)
+def fetch_sorted_page(sort_by: str, order: str, cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> dict:
+    """
+    One page of patients sorted by a field: {'patients': [record, ...], 'next_cursor': ...}.
+    """
+    return _get('/sort', {'sort_by': sort_by, 'order': order, 'limit': limit, 'cursor': cursor})
+
+
+@st.cache_data(ttl=READ_TTL_SECONDS, show_spinner=False)
+def fetch_patient(patient_id: str) -> Optional[dict]:
+    """
+    A single patient record, or None if it does not exist.
+    """
+    try:
+        return _get(f'/patient/{patient_id}')
+    except APIError as e:
+        if e.status_code == 404:
+            return None
+        raise
+
+
+def invalidate_reads() -> None:
+    """
+    Drop every cached read; called after any successful write.
+    """
+    fetch_page.clear()
+    fetch_sorted_page.clear()
+    fetch_patient.clear()
+
+
+# --------- Writes ---------
+def _write(method: str, path: str, payload: Optional[dict] = None) -> dict:
+    response = get_session().request(method, f'{BASE_URL}{path}', json=payload, timeout=TIMEOUT)
+    if response.status_code >= 400:
+        raise APIError(response)
+    invalidate_reads()
+    return response.json()
+
+
+def create_patient(patient: dict) -> dict:
+    return _write('POST', '/create', patient)
+
+
+def update_patient(patient_id: str, changes: dict) -> dict:
+    return _write('PUT', f'/edit/{patient_id}', changes)
+
+
+def delete_patient(patient_id: str) -> dict:
+    return _write('DELETE', f'/delete/{patient_id}')
@@ -1,13 +1,98 @@
 # Import necessary modules from FastAPI, Pydantic, and standard libraries
-from fastapi import FastAPI, Path, HTTPException, Query
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, computed_field
-from typing import Annotated, Literal, Optional
+from fastapi import Depends, FastAPI, Path, HTTPException, Query, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, computed_field
+from pydantic_core import from_json
+from typing import Annotated, Iterator, Literal, Optional
+from contextlib import asynccontextmanager
+from functools import cached_property
+import base64
 import json
+import os
+import sys
 import uvicorn
 
+# Modules shared by the apps in fastapi_intro live in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'common'))
+
+from json_fastpath import FastJSONResponse, RawJSONResponse, dumps, json_body, openapi_body
+from patient_json import RecordJSONCache, json_array, json_object, with_id
+from patient_backend import PatientBackend, record_etag
+from patient_metrics import bmi_verdict, score_records
+from patient_stats import PatientStats
+from patient_store import JSONPatientStore
+from sqlite_store import SQLitePatientStore
+
+# --------- Configuration ---------
+STORAGE_BACKEND = os.environ.get('PATIENTS_BACKEND', 'json')  # 'json' or 'sqlite'
+PATIENTS_FILE = os.environ.get('PATIENTS_FILE', 'patients.json')
+FLUSH_INTERVAL = float(os.environ.get('PATIENTS_FLUSH_INTERVAL', '1.0'))
+STORAGE_MODE = os.environ.get('PATIENTS_STORAGE_MODE', 'snapshot')  # 'snapshot' or 'wal'
+COMPACT_EVERY = int(os.environ.get('PATIENTS_COMPACT_EVERY', '10000'))
+SQLITE_FILE = os.environ.get('PATIENTS_SQLITE_FILE', 'patients.db')
+STREAM_CHUNK_SIZE = 500  # Records fetched from the store per step of an NDJSON stream
+RESCORE_CHUNK_SIZE = 5000  # Records re-scored per batch by /rescore
+# Encoded JSON of the most recently read records, about 250 bytes per entry, so the default
+# keeps ~1 MB of hot records. A cap near the dataset size speeds up repeated full /view and
+# /sort reads, at the price of a second copy of every record in memory
+JSON_CACHE_MAX_ENTRIES = int(os.environ.get('PATIENTS_JSON_CACHE_MAX', '4096'))
+STATS_RELATIVE_ACCURACY = float(os.environ.get('PATIENTS_STATS_ACCURACY', '0.01'))  # Max relative error of BMI percentiles
+STATS_LOAD_CHUNK_SIZE = 5000  # Records read from the store per step when building /stats at startup
+
+def create_store() -> PatientBackend:
+    """
+    Build the storage backend selected by PATIENTS_BACKEND.
+    """
+    if STORAGE_BACKEND == 'json':
+        return JSONPatientStore(
+            PATIENTS_FILE,
+            flush_interval=FLUSH_INTERVAL,
+            mode=STORAGE_MODE,
+            compact_every=COMPACT_EVERY,
+        )
+    if STORAGE_BACKEND == 'sqlite':
+        # A fresh database is seeded from the JSON file so switching backends keeps the data
+        return SQLitePatientStore(SQLITE_FILE, seed_path=PATIENTS_FILE)
+    raise ValueError(f"Invalid storage backend {STORAGE_BACKEND!r}. Select between json and sqlite")
+
+# Process-wide repository, opened at startup and closed (flushed) on shutdown
+store = create_store()
+
+# Encoded JSON of recently read records, refreshed by the store on every write
+record_json = RecordJSONCache(JSON_CACHE_MAX_ENTRIES)
+store.add_listener(record_json.on_change)
+
+# Aggregates behind /stats, kept current by the store on every write
+patient_stats = PatientStats(STATS_RELATIVE_ACCURACY)
+store.add_listener(patient_stats.on_change)
+
+def iter_records() -> Iterator[dict]:
+    """
+    Yield every stored record, reading from the store a chunk at a time.
+    """
+    after = None
+    while True:
+        chunk = store.scan(after=after, limit=STATS_LOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        for _, record in chunk:
+            yield record
+        after = (chunk[-1][0], chunk[-1][0])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the patient store on startup and close it on shutdown.
+    """
+    store.open()
+    # Loading the store does not go through the listeners, so the aggregates start from a scan
+    patient_stats.load(iter_records())
+    yield
+    store.close()
+
 # Initialize the FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # --------- Pydantic Models ---------
 class Patient(BaseModel):
@@ -24,11 +109,12 @@ class Patient(BaseModel):
     weight: Annotated[float, Field(..., gt=0, description='Weight of the patient in kilograms')]
 
     @computed_field
-    @property
+    @cached_property
     def bmi(self) -> float:
         """
         Calculate Body Mass Index (BMI).
         BMI = weight (kg) / (height (m))^2
+        Cached so verdict and repeated dumps do not recompute it.
         """
         return round(self.weight / (self.height ** 2), 2)
 
@@ -38,13 +124,7 @@ class Patient(BaseModel):
         """
         Provide a health verdict based on BMI.
         """
-        if self.bmi < 18.5:
-            return 'Underweight'
-        elif self.bmi < 25:
-            return 'Normal'
-        elif self.bmi < 30:
-            return 'Overweight'
-        return 'Obese'
+        return bmi_verdict(self.bmi)
 
 class PatientUpdate(BaseModel):
     """
@@ -58,20 +138,239 @@ class PatientUpdate(BaseModel):
     height: Annotated[Optional[float], Field(default=None, gt=0)]
     weight: Annotated[Optional[float], Field(default=None, gt=0)]
 
+class PatientBulkUpdate(PatientUpdate):
+    """
+    One item of a bulk update: the patient ID plus the fields to change.
+    """
+    id: Annotated[str, Field(..., description='ID of the patient to update')]
+
+# Validators for whole batches, built once and reused by every bulk request
+patient_list_adapter = TypeAdapter(list[Patient])
+patient_update_list_adapter = TypeAdapter(list[PatientBulkUpdate])
+patient_id_list_adapter = TypeAdapter(list[str])
+
 # --------- Utility Functions ---------
-def load_data() -> dict:
+def encode_cursor(key: tuple, sort_by: Optional[str], descending: bool) -> str:
+    """
+    Encode a keyset position as an opaque URL-safe cursor.
+    The sort field and order are included so a cursor cannot be reused with a different ordering.
+    """
+    payload = [sort_by, 'desc' if descending else 'asc', *key]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: Optional[str], sort_by: Optional[str] = None, descending: bool = False) -> Optional[tuple]:
+    """
+    Decode a cursor produced by encode_cursor for the same ordering, rejecting anything malformed.
+    Returns the (value, patient_id) keyset position.
+    """
+    if cursor is None:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    if not isinstance(payload, list) or len(payload) != 4:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    cursor_sort_by, order, value, patient_id = payload
+    # Keys are the patient ID itself in ID order, otherwise the numeric sort field
+    value_type = str if sort_by is None else (int, float)
+    if (
+        cursor_sort_by != sort_by
+        or order != ('desc' if descending else 'asc')
+        or not isinstance(patient_id, str)
+        or not isinstance(value, value_type)
+        or isinstance(value, bool)
+    ):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    return value, patient_id
+
+def encoded_page(
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+    after: Optional[tuple] = None,
+    limit: Optional[int] = None,
+) -> tuple[list[tuple[str, bytes]], Optional[tuple]]:
+    """
+    Encoded patients of one page plus the keyset position to resume from (None on the last page).
+    Records are only read from the store for patients missing from the encoded cache.
+    """
+    keys = store.scan_keys(sort_by, descending, after, limit)
+    encoded = record_json.encode_ids([patient_id for _, patient_id in keys], store.get_many)
+    return encoded, (keys[-1] if limit and len(keys) == limit else None)
+
+def stream_ndjson(sort_by: Optional[str], descending: bool) -> Iterator[bytes]:
+    """
+    Yield every patient as one JSON line, fetching from the store a chunk at a time.
+    """
+    after = None
+    while True:
+        encoded, after = encoded_page(sort_by, descending, after, STREAM_CHUNK_SIZE)
+        yield b''.join(with_id(patient_id, data) + b'\n' for patient_id, data in encoded)
+        if after is None:
+            return
+
+def page_response(
+    patients: bytes,
+    next_key: Optional[tuple],
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+) -> RawJSONResponse:
+    """
+    One page of an encoded patient collection plus the cursor of the next page.
+    """
+    next_cursor = None if next_key is None else encode_cursor(next_key, sort_by, descending)
+    return RawJSONResponse(b'{"patients":' + patients + b',"next_cursor":' + dumps(next_cursor) + b'}')
+
+def check_if_match(if_match: Optional[str], record: dict) -> None:
+    """
+    Enforce optimistic concurrency: reject the write if the client's ETag is stale.
+    """
+    if if_match is None:
+        return
+    tags = [tag.strip() for tag in if_match.split(',')]
+    if '*' not in tags and record_etag(record) not in tags:
+        raise HTTPException(status_code=412, detail='Patient was modified by another request')
+
+def merge_update(patient_id: str, current: dict, patient_update: PatientUpdate) -> dict:
+    """
+    Apply a partial update to a stored record and re-validate the result.
+    """
+    existing_patient_info = dict(current)
+    updated_patient_info = patient_update.model_dump(exclude_unset=True, exclude={'id'})
+
+    for key, value in updated_patient_info.items():
+        existing_patient_info[key] = value
+
+    existing_patient_info['id'] = patient_id
+    patient_pydantic_obj = Patient(**existing_patient_info)
+    return patient_pydantic_obj.model_dump(exclude=['id'])
+
+async def read_bulk_body(request: Request) -> list:
+    """
+    Read a bulk request body sent either as a JSON array or as NDJSON (one item per line).
+    """
+    body = await request.body()
+    try:
+        if 'ndjson' in request.headers.get('content-type', ''):
+            items = [from_json(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = from_json(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid JSON body')
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail='Expected a JSON array or NDJSON lines')
+    return items
+
+def validate_batch(adapter: TypeAdapter, items: list) -> tuple[list[tuple[int, object]], dict[int, list]]:
     """
-    Load patient data from a JSON file.
+    Validate a whole batch in one pass.
+    Returns (index, model) pairs for valid items and validation errors keyed by item index.
     """
-    with open('patients.json', 'r') as f:
-        return json.load(f)
+    try:
+        return list(enumerate(adapter.validate_python(items))), {}
+    except ValidationError as exc:
+        errors: dict[int, list] = {}
+        for error in exc.errors(include_url=False, include_context=False):
+            errors.setdefault(error['loc'][0], []).append({'loc': error['loc'][1:], 'msg': error['msg']})
+        # Re-validate only the items that passed so they still get applied
+        valid_indexes = [i for i in range(len(items)) if i not in errors]
+        models = adapter.validate_python([items[i] for i in valid_indexes])
+        return list(zip(valid_indexes, models)), errors
 
-def save_data(data: dict) -> None:
+def bulk_response(results: list[dict]) -> dict:
     """
-    Save patient data to a JSON file.
+    Summarise per-item bulk results.
     """
-    with open('patients.json', 'w') as f:
-        json.dump(data, f)
+    failed = sum(1 for result in results if result['status'] >= 400)
+    return {'succeeded': len(results) - failed, 'failed': failed, 'results': results}
+
+def apply_bulk_create(items: list) -> dict:
+    """
+    Create every valid, not yet existing patient of a bulk request in one batch write.
+    """
+    valid, errors = validate_batch(patient_list_adapter, items)
+    results = {i: {'index': i, 'status': 422, 'detail': detail} for i, detail in errors.items()}
+
+    puts = {}
+    with store.record_locks(patient.id for _, patient in valid):
+        for index, patient in valid:
+            if patient.id in puts or patient.id in store:
+                results[index] = {'index': index, 'id': patient.id, 'status': 400, 'detail': 'Patient already exists'}
+                continue
+            puts[patient.id] = patient.model_dump(exclude={'id', 'bmi', 'verdict'})
+            results[index] = {'index': index, 'id': patient.id, 'status': 201, 'detail': 'Patient created successfully'}
+        # BMI and verdict for the whole batch are computed column-wise in one pass
+        store.write_batch(list(zip(puts, score_records(list(puts.values())))), [])
+    return bulk_response([results[i] for i in range(len(items))])
+
+def apply_bulk_update(items: list) -> dict:
+    """
+    Apply every valid partial update of a bulk request to existing patients in one batch write.
+    """
+    valid, errors = validate_batch(patient_update_list_adapter, items)
+    results = {i: {'index': i, 'status': 422, 'detail': detail} for i, detail in errors.items()}
+
+    # Staged records let several updates to the same patient in one batch build on each other
+    staged: dict[str, dict] = {}
+    with store.record_locks(update.id for _, update in valid):
+        for index, update in valid:
+            current = staged.get(update.id) or store.get(update.id)
+            if current is None:
+                results[index] = {'index': index, 'id': update.id, 'status': 404, 'detail': 'Patient not found'}
+                continue
+            try:
+                staged[update.id] = merge_update(update.id, current, update)
+            except ValidationError as exc:
+                detail = [{'loc': error['loc'], 'msg': error['msg']} for error in exc.errors(include_url=False, include_context=False)]
+                results[index] = {'index': index, 'id': update.id, 'status': 422, 'detail': detail}
+                continue
+            results[index] = {'index': index, 'id': update.id, 'status': 200, 'detail': 'Patient updated successfully'}
+        store.write_batch(list(staged.items()), [])
+    return bulk_response([results[i] for i in range(len(items))])
+
+def apply_bulk_delete(items: list) -> dict:
+    """
+    Delete every existing patient listed in a bulk request in one batch write.
+    """
+    valid, errors = validate_batch(patient_id_list_adapter, items)
+    results = {i: {'index': i, 'status': 422, 'detail': detail} for i, detail in errors.items()}
+
+    deletes: dict[str, None] = {}  # Ordered set of IDs to delete
+    with store.record_locks(patient_id for _, patient_id in valid):
+        for index, patient_id in valid:
+            if patient_id in deletes or patient_id not in store:
+                results[index] = {'index': index, 'id': patient_id, 'status': 404, 'detail': 'Patient not found'}
+                continue
+            deletes[patient_id] = None
+            results[index] = {'index': index, 'id': patient_id, 'status': 200, 'detail': 'Patient deleted successfully'}
+        store.write_batch([], list(deletes))
+    return bulk_response([results[i] for i in range(len(items))])
+
+def rescore_all() -> int:
+    """
+    Recompute BMI and verdict for every stored patient, one columnar chunk at a time.
+    Returns the number of records whose stored values changed.
+    """
+    changed = 0
+    after = None
+    while True:
+        chunk = store.scan(after=after, limit=RESCORE_CHUNK_SIZE)
+        if not chunk:
+            return changed
+        ids = [patient_id for patient_id, _ in chunk]
+        with store.record_locks(ids):
+            # Re-read under the locks so a concurrent edit is never overwritten with stale data
+            current = [(patient_id, store.get(patient_id)) for patient_id in ids]
+            current = [(patient_id, record) for patient_id, record in current if record is not None]
+            rescored = score_records([record for _, record in current])
+            updates = [
+                (patient_id, new)
+                for (patient_id, old), new in zip(current, rescored)
+                if (old.get('bmi'), old.get('verdict')) != (new['bmi'], new['verdict'])
+            ]
+            store.write_batch(updates, [])
+        changed += len(updates)
+        after = (ids[-1], ids[-1])
 
 # --------- API Routes ---------
 @app.get("/")
@@ -89,29 +388,46 @@ def about():
     return {'message': 'A fully functional API to manage your patient records'}
 
 @app.get('/view')
-def view():
+def view(
+    limit: Optional[int] = Query(None, gt=0, description='Page size; omit to return every patient'),
+    cursor: Optional[str] = Query(None, description='Cursor returned as next_cursor by the previous page'),
+    format: Literal['json', 'ndjson'] = Query('json', description='ndjson streams one patient per line')
+):
     """
     View all patients in the database.
+    With a limit, patients are returned one page at a time in ID order.
     """
-    return load_data()
+    if format == 'ndjson':
+        return StreamingResponse(stream_ndjson(None, False), media_type='application/x-ndjson')
+    encoded, next_key = encoded_page(after=decode_cursor(cursor), limit=limit)
+    patients = json_object(encoded)
+    if limit is None and cursor is None:
+        return RawJSONResponse(patients)
+    return page_response(patients, next_key)
 
 @app.get('/patient/{patient_id}')
 def view_patient(patient_id: str = Path(..., description='ID of the patient in the DB', example='P001')):
     """
     View details of a specific patient by ID.
+    The ETag header can be sent back as If-Match on edit or delete.
     """
-    data = load_data()
-    if patient_id in data:
-        return data[patient_id]
+    generation = record_json.generation
+    record = store.get(patient_id)
+    if record is not None:
+        return RawJSONResponse(record_json.encode(patient_id, record, generation), headers={'ETag': record_etag(record)})
     raise HTTPException(status_code=404, detail='Patient not found')
 
 @app.get('/sort')
 def sort_patients(
     sort_by: str = Query(..., description='Sort on the basis of height, weight, or BMI'),
-    order: str = Query('asc', description='Sort in ascending or descending order')
+    order: str = Query('asc', description='Sort in ascending or descending order'),
+    limit: Optional[int] = Query(None, gt=0, description='Page size; omit to return every patient'),
+    cursor: Optional[str] = Query(None, description='Cursor returned as next_cursor by the previous page'),
+    format: Literal['json', 'ndjson'] = Query('json', description='ndjson streams one patient per line')
 ):
     """
     Sort patients by a specified field and order.
+    With a limit, the sorted list is returned one page at a time.
     """
     valid_fields = ['height', 'weight', 'bmi']
     if sort_by not in valid_fields:
@@ -119,62 +435,160 @@ def sort_patients(
     if order not in ['asc', 'desc']:
         raise HTTPException(status_code=400, detail='Invalid order. Select between asc and desc')
 
-    data = load_data()
-    sorted_list = sorted(
-        data.values(),
-        key=lambda x: x.get(sort_by, 0),
-        reverse=(order == 'desc')
-    )
-    return sorted_list
+    descending = order == 'desc'
+    if format == 'ndjson':
+        return StreamingResponse(stream_ndjson(sort_by, descending), media_type='application/x-ndjson')
+
+    # Served from the maintained sorted index instead of a full sort per request
+    encoded, next_key = encoded_page(sort_by, descending, decode_cursor(cursor, sort_by, descending), limit)
+    patients = json_array(data for _, data in encoded)
+    if limit is None and cursor is None:
+        return RawJSONResponse(patients)
+    return page_response(patients, next_key, sort_by, descending)
 
-@app.post('/create')
-def create_patient(patient: Patient):
+@app.get('/query')
+def query_patients(
+    city: Optional[str] = Query(None, description='Only patients living in this city'),
+    gender: Optional[Literal['male', 'female', 'others']] = Query(None, description='Only patients of this gender'),
+    verdict: Optional[str] = Query(None, description='Only patients with this health verdict'),
+    min_age: Optional[int] = Query(None, description='Minimum age (inclusive)'),
+    max_age: Optional[int] = Query(None, description='Maximum age (inclusive)'),
+    min_bmi: Optional[float] = Query(None, description='Minimum BMI (inclusive)'),
+    max_bmi: Optional[float] = Query(None, description='Maximum BMI (inclusive)'),
+    min_height: Optional[float] = Query(None, description='Minimum height in meters (inclusive)'),
+    max_height: Optional[float] = Query(None, description='Maximum height in meters (inclusive)'),
+    min_weight: Optional[float] = Query(None, description='Minimum weight in kilograms (inclusive)'),
+    max_weight: Optional[float] = Query(None, description='Maximum weight in kilograms (inclusive)'),
+    sort_by: Optional[str] = Query(None, description='Sort on the basis of height, weight, BMI or age'),
+    order: str = Query('asc', description='Sort in ascending or descending order'),
+    limit: Optional[int] = Query(None, gt=0, description='Maximum number of patients to return')
+):
     """
-    Create a new patient record.
+    Filter patients by equality and range conditions, evaluated over whole columns at once.
     """
-    data = load_data()
-    if patient.id in data:
-        raise HTTPException(status_code=400, detail='Patient already exists')
+    valid_fields = ['height', 'weight', 'bmi', 'age']
+    if sort_by is not None and sort_by not in valid_fields:
+        raise HTTPException(status_code=400, detail=f'Invalid field. Select from {valid_fields}')
+    if order not in ['asc', 'desc']:
+        raise HTTPException(status_code=400, detail='Invalid order. Select between asc and desc')
 
-    data[patient.id] = patient.model_dump(exclude=['id'])
-    save_data(data)
-    return JSONResponse(status_code=201, content={'message': 'Patient created successfully'})
+    equals = {
+        field: value
+        for field, value in (('city', city), ('gender', gender), ('verdict', verdict))
+        if value is not None
+    }
+    ranges = {
+        field: (low, high)
+        for field, low, high in (
+            ('age', min_age, max_age),
+            ('bmi', min_bmi, max_bmi),
+            ('height', min_height, max_height),
+            ('weight', min_weight, max_weight),
+        )
+        if low is not None or high is not None
+    }
+    generation = record_json.generation
+    results = store.query(equals, ranges, sort_by=sort_by, descending=(order == 'desc'), limit=limit)
+    encoded = record_json.encode_many(results, generation)
+    return RawJSONResponse(json_array(with_id(patient_id, data) for (patient_id, _), data in zip(results, encoded)))
 
-@app.put('/edit/{patient_id}')
-def update_patient(patient_id: str, patient_update: PatientUpdate):
+@app.get('/stats')
+def stats(
+    city: Optional[str] = Query(None, description='Only patients living in this city'),
+    gender: Optional[Literal['male', 'female', 'others']] = Query(None, description='Only patients of this gender')
+):
     """
-    Update an existing patient's information.
+    Aggregate statistics: counts by city, gender and verdict, mean and percentile BMI,
+    and an age histogram. Maintained on every write, so a request does not scan patients.
     """
-    data = load_data()
-    if patient_id not in data:
-        raise HTTPException(status_code=404, detail='Patient not found')
+    return patient_stats.summary(city, gender)
 
-    existing_patient_info = data[patient_id]
-    updated_patient_info = patient_update.model_dump(exclude_unset=True)
+@app.post('/create', openapi_extra=openapi_body(Patient))
+def create_patient(patient: Patient = Depends(json_body(Patient))):
+    """
+    Create a new patient record.
+    """
+    with store.record_lock(patient.id):
+        if patient.id in store:
+            raise HTTPException(status_code=400, detail='Patient already exists')
 
-    for key, value in updated_patient_info.items():
-        existing_patient_info[key] = value
+        store.put(patient.id, patient.model_dump(exclude=['id']))
+    return FastJSONResponse(status_code=201, content={'message': 'Patient created successfully'})
 
-    existing_patient_info['id'] = patient_id
-    patient_pydantic_obj = Patient(**existing_patient_info)
-    existing_patient_info = patient_pydantic_obj.model_dump(exclude=['id'])
+@app.put('/edit/{patient_id}', openapi_extra=openapi_body(PatientUpdate))
+def update_patient(
+    patient_id: str,
+    patient_update: PatientUpdate = Depends(json_body(PatientUpdate)),
+    if_match: Optional[str] = Header(None, description='ETag from a previous read; rejects stale updates')
+):
+    """
+    Update an existing patient's information.
+    """
+    # Hold the patient's lock across read-modify-write so concurrent edits cannot drop each other
+    with store.record_lock(patient_id):
+        current = store.get(patient_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail='Patient not found')
+        check_if_match(if_match, current)
 
-    data[patient_id] = existing_patient_info
-    save_data(data)
-    return JSONResponse(status_code=200, content={'message': 'Patient updated successfully'})
+        existing_patient_info = merge_update(patient_id, current, patient_update)
+        store.put(patient_id, existing_patient_info)
+    return FastJSONResponse(
+        status_code=200,
+        content={'message': 'Patient updated successfully'},
+        headers={'ETag': record_etag(existing_patient_info)}
+    )
 
 @app.delete('/delete/{patient_id}')
-def delete_patient(patient_id: str):
+def delete_patient(
+    patient_id: str,
+    if_match: Optional[str] = Header(None, description='ETag from a previous read; rejects stale deletes')
+):
     """
     Delete a patient record by ID.
     """
-    data = load_data()
-    if patient_id not in data:
-        raise HTTPException(status_code=404, detail='Patient not found')
+    with store.record_lock(patient_id):
+        current = store.get(patient_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail='Patient not found')
+        check_if_match(if_match, current)
 
-    del data[patient_id]
-    save_data(data)
-    return JSONResponse(status_code=200, content={'message': 'Patient deleted successfully'})
+        store.delete(patient_id)
+    return FastJSONResponse(status_code=200, content={'message': 'Patient deleted successfully'})
+
+@app.post('/bulk/create')
+async def bulk_create_patients(request: Request):
+    """
+    Create many patients from a JSON array or NDJSON body.
+    The batch is validated in one pass and written in a single storage transaction;
+    the response reports a status for every item.
+    """
+    items = await read_bulk_body(request)
+    return await run_in_threadpool(apply_bulk_create, items)
+
+@app.put('/bulk/edit')
+async def bulk_update_patients(request: Request):
+    """
+    Apply many partial updates, each item carrying the patient ID and the fields to change.
+    """
+    items = await read_bulk_body(request)
+    return await run_in_threadpool(apply_bulk_update, items)
+
+@app.post('/bulk/delete')
+async def bulk_delete_patients(request: Request):
+    """
+    Delete many patients given a JSON array (or NDJSON lines) of patient IDs.
+    """
+    items = await read_bulk_body(request)
+    return await run_in_threadpool(apply_bulk_delete, items)
+
+@app.post('/rescore')
+def rescore_patients():
+    """
+    Recompute stored BMI and verdicts, e.g. after the BMI thresholds change.
+    """
+    changed = rescore_all()
+    return {'message': 'Patients rescored successfully', 'changed': changed}
 
 # --------- Run the App ---------
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+# Storage interface shared by every patient persistence engine
+import hashlib
+import json
+import threading
+from abc import ABC, abstractmethod
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+RECORD_LOCK_STRIPES = 64
+
+# listener(patient_id, previous, record): previous is None for an insert, record None for a delete
+ChangeListener = Callable[[str, Optional[dict], Optional[dict]], None]
+
+
+def record_etag(record: dict) -> str:
+    """
+    Content-based entity tag for a patient record, stable across restarts.
+    """
+    digest = hashlib.sha1(json.dumps(record, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:16]}"'
+
+
+class PatientBackend(ABC):
+    """
+    Abstract patient storage.
+    Records are plain dicts keyed by patient ID; routes only talk to this interface,
+    so the engine behind it is picked by configuration.
+    """
+
+    def __init__(self):
+        self._record_locks = [threading.Lock() for _ in range(RECORD_LOCK_STRIPES)]
+        self._listeners: list[ChangeListener] = []
+
+    # --------- Lifecycle ---------
+    def open(self) -> None:
+        """
+        Acquire resources; called once at application startup.
+        """
+
+    def close(self) -> None:
+        """
+        Persist outstanding work and release resources; called once at shutdown.
+        """
+
+    def record_lock(self, patient_id: str) -> threading.Lock:
+        """
+        Lock guarding read-modify-write of one patient.
+        IDs are hashed onto a fixed set of stripes, so unrelated patients rarely contend.
+        """
+        return self._record_locks[hash(patient_id) % RECORD_LOCK_STRIPES]
+
+    @contextmanager
+    def record_locks(self, patient_ids: Iterable[str]) -> Iterator[None]:
+        """
+        Hold the locks of several patients at once.
+        Stripes are taken in a fixed order so two batches can never deadlock.
+        """
+        stripes = sorted({hash(patient_id) % RECORD_LOCK_STRIPES for patient_id in patient_ids})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._record_locks[stripe])
+            yield
+
+    # --------- Change listeners ---------
+    def add_listener(self, listener: ChangeListener) -> None:
+        """
+        Call `listener` after every put or delete, with the record before and after.
+        Listeners run while the write is still serialised against other writes, so they
+        must be quick and must not call back into the store.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, patient_id: str, previous: Optional[dict], record: Optional[dict]) -> None:
+        for listener in self._listeners:
+            listener(patient_id, previous, record)
+
+    # --------- Reads ---------
+    def __contains__(self, patient_id: str) -> bool:
+        return self.get(patient_id) is not None
+
+    @abstractmethod
+    def get(self, patient_id: str) -> Optional[dict]:
+        """
+        Return the stored record for a patient, or None if it does not exist.
+        """
+
+    @abstractmethod
+    def scan(
+        self,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        """
+        Return the next `limit` (patient_id, record) pairs in sort_by order
+        (patient ID order when None), resuming after the (value, patient_id) keyset cursor.
+        """
+
+    def scan_keys(
+        self,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple]:
+        """
+        Like scan, but return only the (value, patient_id) keyset position of each record
+        (value is the ID itself when sort_by is None); records are then read with get_many.
+        """
+        return [
+            (patient_id if sort_by is None else record[sort_by], patient_id)
+            for patient_id, record in self.scan(sort_by, descending, after, limit)
+        ]
+
+    def get_many(self, patient_ids: list[str]) -> dict[str, dict]:
+        """
+        Return the stored records of the given patients that exist, keyed by ID.
+        """
+        records = ((patient_id, self.get(patient_id)) for patient_id in patient_ids)
+        return {patient_id: record for patient_id, record in records if record is not None}
+
+    @abstractmethod
+    def query(
+        self,
+        equals: Optional[dict] = None,
+        ranges: Optional[dict] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        """
+        Return (patient_id, record) pairs matching every filter.
+
+        equals maps city, gender or verdict to the required value; ranges maps
+        height, weight, bmi or age to an inclusive (low, high) pair where either
+        end may be None. When sort_by is given, results come back in that order.
+        """
+
+    def to_dict(self) -> dict:
+        """
+        Return all records keyed by patient ID.
+        """
+        return dict(self.scan())
+
+    # --------- Mutations ---------
+    @abstractmethod
+    def put(self, patient_id: str, record: dict) -> None:
+        """
+        Insert or replace a patient record.
+        The record must not be mutated afterwards, since readers may share it without locking.
+        """
+
+    @abstractmethod
+    def delete(self, patient_id: str) -> None:
+        """
+        Remove a patient record.
+        """
+
+    def write_batch(self, puts: list[tuple[str, dict]], deletes: list[str]) -> None:
+        """
+        Apply many puts and deletes as one unit.
+        Engines override this to use a single transaction or group commit.
+        """
+        for patient_id, record in puts:
+            self.put(patient_id, record)
+        for patient_id in deletes:
+            self.delete(patient_id)
@@ -0,0 +1,129 @@
+# Sorted indexes over patient records, maintained incrementally on every mutation
+#
+# They give keyset pagination and top-N ordering in O(log n + page); filtering itself
+# is done by the PatientTable, from its per-value row sets and vectorised column scans.
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Iterator, Optional
+
+# Numeric fields kept in sorted order for keyset pages and top-N sorting
+SORTED_FIELDS = ('height', 'weight', 'bmi', 'age')
+
+
+class SortedIndex:
+    """
+    (value, patient_id) pairs in sorted order, kept as two parallel sequences: the values
+    (a compact array of doubles for numeric fields) and the IDs, which are shared with
+    the table rather than wrapped in a tuple per entry.
+    Lookups and range boundaries are found with binary search.
+    """
+
+    def __init__(self, numeric: bool = True):
+        self._values = array('d') if numeric else []
+        self._ids: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, values: list, patient_ids: list[str]) -> None:
+        """
+        Replace the contents with the given pairs, sorted once.
+        """
+        pairs = sorted((value, patient_id) for value, patient_id in zip(values, patient_ids) if value is not None)
+        sorted_values = [value for value, _ in pairs]
+        self._values = array('d', sorted_values) if isinstance(self._values, array) else sorted_values
+        self._ids = [patient_id for _, patient_id in pairs]
+
+    def _position(self, value, patient_id: str, right: bool = False) -> int:
+        # Equal values are ordered by ID, so the tie run is searched on the IDs
+        lo = bisect_left(self._values, value)
+        hi = bisect_right(self._values, value, lo)
+        return (bisect_right if right else bisect_left)(self._ids, patient_id, lo, hi)
+
+    def add(self, value, patient_id: str) -> None:
+        i = self._position(value, patient_id)
+        self._values.insert(i, value)
+        self._ids.insert(i, patient_id)
+
+    def remove(self, value, patient_id: str) -> None:
+        i = self._position(value, patient_id)
+        if i < len(self._ids) and self._ids[i] == patient_id and self._values[i] == value:
+            del self._values[i]
+            del self._ids[i]
+
+    def range(self, low=None, high=None, reverse: bool = False, after: Optional[tuple] = None) -> Iterator[str]:
+        """
+        Yield patient IDs whose value lies in [low, high], in value order.
+        `after` is a (value, patient_id) keyset cursor: iteration resumes just past it.
+        """
+        start = 0 if low is None else bisect_left(self._values, low)
+        stop = len(self._ids) if high is None else bisect_right(self._values, high)
+        if after is not None:
+            if reverse:
+                stop = min(stop, self._position(*after))
+            else:
+                start = max(start, self._position(*after, right=True))
+        if reverse:
+            return (self._ids[i] for i in range(stop - 1, start - 1, -1))
+        return (self._ids[i] for i in range(start, stop))
+
+
+class PatientIndexes:
+    """
+    All sorted indexes for the patient store.
+    The caller is responsible for serialising add/remove with page.
+    """
+
+    def __init__(self):
+        # Patient IDs in key order; drives unfiltered scans
+        self.ids = SortedIndex(numeric=False)
+        self.sorted = {field: SortedIndex() for field in SORTED_FIELDS}
+
+    @classmethod
+    def build(cls, patient_ids: list[str], values: dict[str, list]) -> 'PatientIndexes':
+        """
+        Bulk-load every index from parallel lists of IDs and per-field values.
+        """
+        indexes = cls()
+        indexes.ids.load(patient_ids, patient_ids)
+        for field, index in indexes.sorted.items():
+            index.load(values[field], patient_ids)
+        return indexes
+
+    def add(self, patient_id: str, record: dict) -> None:
+        self.ids.add(patient_id, patient_id)
+        for field, index in self.sorted.items():
+            if record.get(field) is not None:
+                index.add(record[field], patient_id)
+
+    def remove(self, patient_id: str, record: dict) -> None:
+        self.ids.remove(patient_id, patient_id)
+        for field, index in self.sorted.items():
+            if record.get(field) is not None:
+                index.remove(record[field], patient_id)
+
+    def replace(self, patient_id: str, previous: dict, record: dict) -> None:
+        """
+        Re-index an updated record, touching only the indexes whose value changed.
+        """
+        for field, index in self.sorted.items():
+            if previous.get(field) != record.get(field):
+                if previous.get(field) is not None:
+                    index.remove(previous[field], patient_id)
+                if record.get(field) is not None:
+                    index.add(record[field], patient_id)
+
+    def page(
+        self,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> list[str]:
+        """
+        Return the next `limit` IDs in sort_by order (patient ID order when None),
+        resuming after the (value, patient_id) keyset cursor.
+        """
+        index = self.ids if sort_by is None else self.sorted[sort_by]
+        return list(islice(index.range(reverse=descending, after=after), limit))
@@ -0,0 +1,115 @@
+# Encoded JSON of stored patient records, so large reads only join cached fragments
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from json_fastpath import dumps
+
+
+# --------- Encoded record cache ---------
+class RecordJSONCache:
+    """
+    Encoded bytes of recently read records, keyed by patient ID, least recently used evicted first.
+
+    Writers bump `generation` and refresh or drop the entry of every record they change
+    (see on_change). Readers note the generation before loading records and only fill
+    missing entries if no write happened since, so bytes encoded from a record read just
+    before a write never end up in the cache.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def on_change(self, patient_id: str, previous: Optional[dict], record: Optional[dict]) -> None:
+        """
+        Store listener: re-encode a cached record that changed, drop a deleted one.
+        """
+        with self._lock:
+            self.generation += 1
+            if record is None:
+                self._entries.pop(patient_id, None)
+            elif patient_id in self._entries:
+                self._entries[patient_id] = dumps(record)
+
+    def encode(self, patient_id: str, record: dict, since: Optional[int] = None) -> bytes:
+        return self.encode_many([(patient_id, record)], since)[0]
+
+    def encode_many(self, pairs: Iterable[tuple[str, dict]], since: Optional[int] = None) -> list[bytes]:
+        """
+        Encoded bytes for each (patient_id, record) pair, from the cache where possible.
+        `since` is the generation read before the records were loaded; without it nothing is cached.
+        """
+        entries = self._entries
+        encoded = []
+        hits = []
+        fresh = {}
+        for patient_id, record in pairs:
+            data = entries.get(patient_id)
+            if data is None:
+                data = fresh[patient_id] = dumps(record)
+            else:
+                hits.append(patient_id)
+            encoded.append(data)
+        self._fill(hits, fresh, since)
+        return encoded
+
+    def encode_ids(self, patient_ids: list[str], load_many: Callable[[list[str]], dict]) -> list[tuple[str, bytes]]:
+        """
+        (patient_id, bytes) for each patient, loading records with load_many(ids) -> {id: record}
+        only for cache misses. Patients deleted since their IDs were read are left out.
+        """
+        since = self.generation
+        entries = self._entries
+        encoded = {patient_id: entries.get(patient_id) for patient_id in patient_ids}
+        hits = [patient_id for patient_id, data in encoded.items() if data is not None]
+        fresh = {}
+        if len(hits) < len(encoded):
+            missing = [patient_id for patient_id, data in encoded.items() if data is None]
+            fresh = {patient_id: dumps(record) for patient_id, record in load_many(missing).items()}
+            encoded.update(fresh)
+        self._fill(hits, fresh, since)
+        return [(patient_id, data) for patient_id, data in encoded.items() if data is not None]
+
+    def _fill(self, hits: list[str], fresh: dict[str, bytes], since: Optional[int]) -> None:
+        if not hits and not fresh:
+            return
+        entries = self._entries
+        with self._lock:
+            for patient_id in hits:
+                if patient_id in entries:
+                    entries.move_to_end(patient_id)
+            if since != self.generation or self.max_entries <= 0:
+                return
+            # A page larger than the cache would only evict its own first records
+            for patient_id, data in list(fresh.items())[-self.max_entries:]:
+                if patient_id not in entries:
+                    entries[patient_id] = data
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+
+def json_object(items: Iterable[tuple[str, bytes]]) -> bytes:
+    """
+    Join (key, encoded value) pairs into a JSON object.
+    """
+    return b'{' + b','.join(dumps(key) + b':' + value for key, value in items) + b'}'
+
+
+def json_array(values: Iterable[bytes]) -> bytes:
+    """
+    Join encoded values into a JSON array.
+    """
+    return b'[' + b','.join(values) + b']'
+
+
+def with_id(patient_id: str, value: bytes) -> bytes:
+    """
+    Prefix an encoded (non-empty) record object with its "id" field.
+    """
+    return b'{"id":' + dumps(patient_id) + b',' + value[1:]
@@ -0,0 +1,55 @@
+# BMI and health verdict rules, for single records and columnar batches
+from bisect import bisect_right
+
+import numpy as np
+
+# Upper bounds (exclusive) of every verdict except the last
+BMI_THRESHOLDS = (18.5, 25, 30)
+VERDICT_LABELS = ('Underweight', 'Normal', 'Overweight', 'Obese')
+_VERDICT_ARRAY = np.array(VERDICT_LABELS, dtype=object)
+
+
+def bmi_verdict(bmi: float) -> str:
+    """
+    Health verdict for one BMI value.
+    """
+    return VERDICT_LABELS[bisect_right(BMI_THRESHOLDS, bmi)]
+
+
+def compute_bmi(heights, weights) -> np.ndarray:
+    """
+    BMI for whole columns of heights (m) and weights (kg), rounded to 2 decimals.
+    """
+    heights = np.asarray(heights, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    raw = weights / heights ** 2
+    bmi = np.round(raw, 2)
+    # np.round scales by 100 before rounding, which can break near-ties differently from
+    # Python's correctly rounded round(); redo just those few values so both paths agree
+    scaled = raw * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        bmi[near_tie] = [round(value, 2) for value in raw[near_tie].tolist()]
+    return bmi
+
+
+def compute_verdicts(bmi) -> np.ndarray:
+    """
+    Health verdict for a whole column of BMI values.
+    np.digitize bins each value against the thresholds in one pass.
+    """
+    return _VERDICT_ARRAY[np.digitize(bmi, BMI_THRESHOLDS)]
+
+
+def score_records(records: list[dict]) -> list[dict]:
+    """
+    Return copies of the records with 'bmi' and 'verdict' filled in from their height and weight.
+    """
+    if not records:
+        return []
+    bmi = compute_bmi([r['height'] for r in records], [r['weight'] for r in records])
+    verdicts = compute_verdicts(bmi)
+    return [
+        {**record, 'bmi': float(b), 'verdict': v}
+        for record, b, v in zip(records, bmi.tolist(), verdicts.tolist())
+    ]
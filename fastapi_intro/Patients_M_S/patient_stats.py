@@ -0,0 +1,242 @@
+# Aggregate patient statistics maintained incrementally from store changes
+#
+# Every create, edit and delete adjusts running counts and sums in O(1) instead of
+# rescanning the dataset. BMI percentiles come from a log-bucketed quantile sketch
+# (the DDSketch scheme): buckets only hold counts, so a value can be removed again and
+# two sketches merge by adding their counts, and each estimate is within a fixed
+# relative error of the true value.
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+PERCENTILES = (25, 50, 75, 90, 95, 99)
+AGE_BUCKET_YEARS = 10
+
+
+class QuantileSketch:
+    """
+    Quantile estimates for positive values within `relative_accuracy` of the true value.
+    Value x is counted in bucket ceil(log_gamma(x)); non-positive values share one bucket.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Counter = Counter()
+        self.zero_count = 0
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """
+        Count `value` `weight` times; a negative weight removes earlier additions.
+        """
+        if value > 0:
+            key = self._key(value)
+            self.buckets[key] += weight
+            if not self.buckets[key]:
+                del self.buckets[key]
+        else:
+            self.zero_count += weight
+        self.count += weight
+
+    def add_many(self, values: list[float]) -> None:
+        positive = [value for value in values if value > 0]
+        self.buckets.update(self._key(value) for value in positive)
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        Fold another sketch with the same accuracy into this one.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('Cannot merge sketches with different accuracies')
+        self.buckets.update(other.buckets)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimated value at quantile q (0..1), or None when the sketch is empty.
+        Cost depends on the number of buckets, not on how many values were added.
+        """
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key] in relative terms
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class Aggregate:
+    """
+    Running statistics over one slice of patients: all of them, one city, one gender or both.
+    BMI is summed in hundredths, matching its stored precision, so removals never drift.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.age_sum = 0
+        self.bmi_centi_sum = 0
+        self.by_city: Counter = Counter()
+        self.by_gender: Counter = Counter()
+        self.by_verdict: Counter = Counter()
+        self.age_buckets: Counter = Counter()
+        self.bmi = QuantileSketch(relative_accuracy)
+        self._summary: Optional[dict] = None
+
+    def add(self, record: dict, weight: int = 1) -> None:
+        """
+        Count a record in the slice; weight -1 removes it again.
+        """
+        self.count += weight
+        self.age_sum += record['age'] * weight
+        self.bmi_centi_sum += round(record['bmi'] * 100) * weight
+        for counter, key in (
+            (self.by_city, record['city']),
+            (self.by_gender, record['gender']),
+            (self.by_verdict, record['verdict']),
+            (self.age_buckets, record['age'] // AGE_BUCKET_YEARS),
+        ):
+            counter[key] += weight
+            if not counter[key]:
+                del counter[key]
+        self.bmi.add(record['bmi'], weight)
+        self._summary = None
+
+    def add_many(self, records: list[dict]) -> None:
+        ages = [record['age'] for record in records]
+        bmis = [record['bmi'] for record in records]
+        self.count += len(records)
+        self.age_sum += sum(ages)
+        self.bmi_centi_sum += sum(round(bmi * 100) for bmi in bmis)
+        for counter, field in ((self.by_city, 'city'), (self.by_gender, 'gender'), (self.by_verdict, 'verdict')):
+            counter.update(record[field] for record in records)
+        self.age_buckets.update(age // AGE_BUCKET_YEARS for age in ages)
+        self.bmi.add_many(bmis)
+        self._summary = None
+
+    def merge(self, other: 'Aggregate') -> None:
+        """
+        Fold the statistics of a disjoint slice into this one.
+        """
+        self.count += other.count
+        self.age_sum += other.age_sum
+        self.bmi_centi_sum += other.bmi_centi_sum
+        for mine, theirs in (
+            (self.by_city, other.by_city),
+            (self.by_gender, other.by_gender),
+            (self.by_verdict, other.by_verdict),
+            (self.age_buckets, other.age_buckets),
+        ):
+            mine.update(theirs)
+        self.bmi.merge(other.bmi)
+        self._summary = None
+
+    def summary(self) -> dict:
+        """
+        JSON-ready statistics of the slice, kept until the slice next changes.
+        """
+        if self._summary is None:
+            count = self.count
+            self._summary = {
+                'count': count,
+                'by_city': dict(sorted(self.by_city.items())),
+                'by_gender': dict(sorted(self.by_gender.items())),
+                'by_verdict': dict(sorted(self.by_verdict.items())),
+                'bmi': {
+                    'mean': round(self.bmi_centi_sum / count / 100, 2) if count else None,
+                    'percentiles': {f'p{p}': self._bmi_percentile(p) for p in PERCENTILES},
+                    'relative_accuracy': self.bmi.relative_accuracy,
+                },
+                'age': {
+                    'mean': round(self.age_sum / count, 2) if count else None,
+                    'histogram': {
+                        f'{bucket * AGE_BUCKET_YEARS}-{(bucket + 1) * AGE_BUCKET_YEARS - 1}': n
+                        for bucket, n in sorted(self.age_buckets.items())
+                    },
+                },
+            }
+        return self._summary
+
+    def _bmi_percentile(self, percentile: int) -> Optional[float]:
+        value = self.bmi.quantile(percentile / 100)
+        return None if value is None else round(value, 2)
+
+
+class PatientStats:
+    """
+    Aggregates for all patients and for every city, gender and (city, gender) pair.
+    Register on_change as a store listener and call load() once after the store opens;
+    from then on each write updates four slices and a read only returns a cached summary.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._slices: dict[tuple, Aggregate] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _slice_keys(record: dict) -> tuple:
+        city, gender = record['city'], record['gender']
+        return (None, None), (city, None), (None, gender), (city, gender)
+
+    def _add(self, record: dict, weight: int) -> None:
+        for key in self._slice_keys(record):
+            aggregate = self._slices.get(key)
+            if aggregate is None:
+                aggregate = self._slices[key] = Aggregate(self.relative_accuracy)
+            aggregate.add(record, weight)
+            if not aggregate.count and key != (None, None):
+                del self._slices[key]
+
+    def load(self, records: Iterable[dict]) -> None:
+        """
+        Replace every aggregate with statistics of `records`, e.g. the store's contents at startup.
+        """
+        groups = defaultdict(list)
+        for record in records:
+            groups[record['city'], record['gender']].append(record)
+
+        # Fill each (city, gender) slice in bulk, then merge those into the wider slices
+        slices = {(None, None): Aggregate(self.relative_accuracy)}
+        for (city, gender), group in groups.items():
+            pair = slices[city, gender] = Aggregate(self.relative_accuracy)
+            pair.add_many(group)
+            for key in ((city, None), (None, gender), (None, None)):
+                if key not in slices:
+                    slices[key] = Aggregate(self.relative_accuracy)
+                slices[key].merge(pair)
+        with self._lock:
+            self._slices = slices
+
+    def on_change(self, patient_id: str, previous: Optional[dict], record: Optional[dict]) -> None:
+        """
+        Store listener: move a patient's contribution from its old record to its new one.
+        """
+        with self._lock:
+            if previous is not None:
+                self._add(previous, -1)
+            if record is not None:
+                self._add(record, 1)
+
+    def summary(self, city: Optional[str] = None, gender: Optional[str] = None) -> dict:
+        """
+        Statistics of all patients, or only those in `city` and/or of `gender`.
+        """
+        with self._lock:
+            aggregate = self._slices.get((city, gender))
+            if aggregate is None:
+                aggregate = Aggregate(self.relative_accuracy)
+            return aggregate.summary()
@@ -0,0 +1,338 @@
+# JSON file backend: in-memory patient repository with write-behind persistence
+#
+# Two storage modes are supported:
+#   snapshot - every flush rewrites the whole JSON file
+#   wal      - every flush appends the batched mutations to a write-ahead log
+#              and fsyncs once (group commit); the log is folded back into the
+#              snapshot by periodic compaction and replayed on startup
+#
+# Records live in a columnar PatientTable and are materialised as dicts only when
+# read. Read-modify-write sequences on one patient are serialised by the backend's
+# striped per-record lock, writes to the table and indexes by a short internal lock,
+# and only the flusher thread writes to disk.
+#
+# Point reads and key scans do not take the lock. Writers bump a version counter
+# around every mutation (odd while one is in progress) and readers retry when it
+# moved under them, since a delete moves another patient's row into the freed slot.
+import heapq
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+import numpy as np
+
+from patient_backend import PatientBackend
+from patient_index import SORTED_FIELDS, PatientIndexes
+from patient_table import PatientTable
+
+# Optimistic attempts before a reader falls back to taking the write lock
+OPTIMISTIC_READ_ATTEMPTS = 3
+
+T = TypeVar('T')
+
+
+class JSONPatientStore(PatientBackend):
+    """
+    Process-wide patient repository backed by a JSON file.
+    The JSON file is loaded once on open() into a columnar table; reads are served
+    from memory and mutations are flushed to disk by a background write-behind thread.
+    """
+
+    def __init__(
+        self,
+        path: str = 'patients.json',
+        flush_interval: float = 1.0,
+        mode: str = 'snapshot',
+        compact_every: int = 10000,
+    ):
+        if mode not in ('snapshot', 'wal'):
+            raise ValueError(f"Invalid storage mode {mode!r}. Select between snapshot and wal")
+        super().__init__()
+        self.path = path
+        self.log_path = f'{path}.wal'
+        self.flush_interval = flush_interval
+        self.mode = mode
+        self.compact_every = compact_every
+        self._table = PatientTable()
+        self.indexes = PatientIndexes()
+        self._pending: list[dict] = []
+        self._log_size = 0
+        self._lock = threading.Lock()
+        self._version = 0
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # --------- Lifecycle ---------
+    def open(self) -> None:
+        """
+        Load the snapshot (plus any write-ahead log) and start the background flusher.
+        """
+        records = self._read_snapshot()
+        self._log_size = self._replay_log(records)
+        self._table = PatientTable.from_records(records)
+        del records
+        self.indexes = PatientIndexes.build(
+            self._table.ids, {field: self._table.column(field).tolist() for field in SORTED_FIELDS}
+        )
+        if self.mode == 'snapshot' and self._log_size:
+            # A log left by an earlier run in wal mode is never written to again, so fold it
+            # in now; otherwise it would be replayed over every newer snapshot
+            self._compact(self._table)
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._run, name='patient-store-flusher', daemon=True)
+        self._flusher.start()
+
+    def read_records(self) -> dict:
+        """
+        Current contents on disk (snapshot plus write-ahead log) as {patient_id: record},
+        without opening the store or changing its files.
+        """
+        records = self._read_snapshot()
+        self._replay_log(records)
+        return records
+
+    def close(self) -> None:
+        """
+        Stop the flusher and force a final flush of pending changes.
+        """
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    # --------- Reads ---------
+    def __contains__(self, patient_id: str) -> bool:
+        return patient_id in self._table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def _read(self, read: Callable[[], T]) -> T:
+        """
+        Run `read` without the lock, retrying if a write ran concurrently.
+        A read racing a write may see a half-moved row or fail outright; either way the
+        version no longer matches and the result is discarded.
+        """
+        for _ in range(OPTIMISTIC_READ_ATTEMPTS):
+            version = self._version
+            if version & 1:
+                continue
+            try:
+                result = read()
+            except (IndexError, KeyError):
+                continue
+            if self._version == version:
+                return result
+        # Writes kept landing mid-read, so wait for the current one instead
+        with self._lock:
+            return read()
+
+    def get(self, patient_id: str) -> Optional[dict]:
+        return self._read(lambda: self._table.get(patient_id))
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            ids = self.indexes.page()
+            return dict(zip(ids, self._table.records(ids)))
+
+    def query(
+        self,
+        equals: Optional[dict] = None,
+        ranges: Optional[dict] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        with self._lock:
+            # Rare equality values start from the table's row index, other filters scan its columns
+            table = self._table
+            rows = table.match(equals, ranges)
+            if sort_by is None:
+                ids = table.ids_at(rows)
+                ids = sorted(ids) if limit is None or len(ids) <= limit else heapq.nsmallest(limit, ids)
+            else:
+                values = table.column(sort_by)[rows]
+                if limit is not None and len(rows) > limit:
+                    # Only rows up to the limit-th value (ties included) can make the top `limit`
+                    keys = -values if descending else values
+                    keep = keys <= np.partition(keys, limit - 1)[limit - 1]
+                    rows, values = rows[keep], values[keep]
+                order = sorted(zip(values.tolist(), table.ids_at(rows)), reverse=descending)
+                ids = [patient_id for _, patient_id in order[:limit]]
+            return list(zip(ids, table.records(ids)))
+
+    def scan(
+        self,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        with self._lock:
+            ids = self.indexes.page(sort_by, descending, after, limit)
+            return list(zip(ids, self._table.records(ids)))
+
+    def scan_keys(
+        self,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple]:
+        # Keys come straight from the indexes and columns; no record is materialised
+        def read() -> list[tuple]:
+            ids = self.indexes.page(sort_by, descending, after, limit)
+            if sort_by is None:
+                return list(zip(ids, ids))
+            rows = [self._table.rows[patient_id] for patient_id in ids]
+            return list(zip(self._table.column(sort_by)[rows].tolist(), ids))
+        return self._read(read)
+
+    def get_many(self, patient_ids: list[str]) -> dict[str, dict]:
+        def read() -> dict[str, dict]:
+            present = [patient_id for patient_id in patient_ids if patient_id in self._table]
+            return dict(zip(present, self._table.records(present)))
+        return self._read(read)
+
+    # --------- Mutations ---------
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        with self._lock:
+            self._version += 1
+            try:
+                yield
+            finally:
+                self._version += 1
+
+    def put(self, patient_id: str, record: dict) -> None:
+        # Persisted on the next flush
+        with self._writing():
+            self._apply_put(patient_id, record)
+
+    def delete(self, patient_id: str) -> None:
+        # Persisted on the next flush
+        with self._writing():
+            self._apply_delete(patient_id)
+
+    def write_batch(self, puts: list[tuple[str, dict]], deletes: list[str]) -> None:
+        # One lock hold for the whole batch; the flusher then writes it in a single group commit
+        with self._writing():
+            for patient_id, record in puts:
+                self._apply_put(patient_id, record)
+            for patient_id in deletes:
+                self._apply_delete(patient_id)
+
+    def _apply_put(self, patient_id: str, record: dict) -> None:
+        previous = self._table.get(patient_id)
+        self._table.put(patient_id, record)
+        # Read back so the indexes, log and listeners see the values as stored (e.g. weights as floats)
+        record = self._table.get(patient_id)
+        if previous is None:
+            self.indexes.add(patient_id, record)
+        else:
+            self.indexes.replace(patient_id, previous, record)
+        self._pending.append({'op': 'put', 'id': patient_id, 'record': record})
+        self._notify(patient_id, previous, record)
+
+    def _apply_delete(self, patient_id: str) -> None:
+        previous = self._table.get(patient_id)
+        self._table.delete(patient_id)
+        self.indexes.remove(patient_id, previous)
+        self._pending.append({'op': 'delete', 'id': patient_id})
+        self._notify(patient_id, previous, None)
+
+    # --------- Persistence ---------
+    def flush(self) -> None:
+        """
+        Write all pending changes to disk in one batch.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                # Only copy the full dataset when it is actually going to be written out
+                needs_snapshot = self.mode == 'snapshot' or self._log_size + len(batch) >= self.compact_every
+                snapshot = self._table.copy() if needs_snapshot else None
+
+            if self.mode == 'snapshot':
+                self._write_snapshot(snapshot)
+                return
+
+            self._append_log(batch)
+            if snapshot is not None:
+                self._compact(snapshot)
+
+    def compact(self) -> None:
+        """
+        Fold the write-ahead log back into the snapshot.
+        """
+        self.flush()
+        with self._flush_lock:
+            with self._lock:
+                snapshot = self._table.copy()
+            self._compact(snapshot)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _compact(self, snapshot: PatientTable) -> None:
+        # The snapshot already covers every logged record, so the log can be reset.
+        # A crash between the two steps only means the log is replayed again,
+        # which is harmless because puts and deletes are idempotent.
+        self._write_snapshot(snapshot)
+        with open(self.log_path, 'w') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_size = 0
+
+    def _append_log(self, batch: list[dict]) -> None:
+        # Group commit: one write and one fsync for the whole batch
+        lines = ''.join(json.dumps(entry) + '\n' for entry in batch)
+        with open(self.log_path, 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_size += len(batch)
+
+    def _replay_log(self, records: dict) -> int:
+        if not os.path.exists(self.log_path):
+            return 0
+        replayed = 0
+        with open(self.log_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-append; everything before it is intact
+                    break
+                if entry['op'] == 'put':
+                    records[entry['id']] = entry['record']
+                else:
+                    records.pop(entry['id'], None)
+                replayed += 1
+        return replayed
+
+    def _read_snapshot(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def _write_snapshot(self, snapshot: PatientTable) -> None:
+        # Write to a temporary file first so a crash never leaves a half-written snapshot.
+        # Records are encoded a chunk at a time instead of building the whole dict first.
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('{')
+            for i, chunk in enumerate(snapshot.chunks()):
+                f.write((', ' if i else '') + json.dumps(chunk)[1:-1])
+            f.write('}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
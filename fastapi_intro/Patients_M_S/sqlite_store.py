@@ -0,0 +1,216 @@
+# SQLite backend: indexed columns, WAL journal and row-level writes
+import json
+import sqlite3
+import threading
+from typing import Optional
+
+from patient_backend import PatientBackend
+from patient_store import JSONPatientStore
+
+# Columns extracted from the record for filtering and sorting; the full record lives in `data`
+INDEXED_COLUMNS = ('city', 'gender', 'verdict', 'age', 'height', 'weight', 'bmi')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS patients (
+    id      TEXT PRIMARY KEY,
+    city    TEXT,
+    gender  TEXT,
+    verdict TEXT,
+    age     INTEGER,
+    height  REAL,
+    weight  REAL,
+    bmi     REAL,
+    data    TEXT NOT NULL
+);
+''' + ''.join(
+    # (column, id) matches the keyset order used by scan, so pages are index range scans
+    f'CREATE INDEX IF NOT EXISTS idx_patients_{column} ON patients ({column}, id);\n'
+    for column in INDEXED_COLUMNS
+)
+
+
+class SQLitePatientStore(PatientBackend):
+    """
+    Patient repository stored in an SQLite database.
+    Each thread gets its own connection; WAL mode lets readers run alongside the
+    single writer, and every put/delete touches one row instead of the whole dataset.
+    """
+
+    def __init__(self, path: str = 'patients.db', seed_path: Optional[str] = None):
+        super().__init__()
+        self.path = path
+        self.seed_path = seed_path
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    # --------- Lifecycle ---------
+    def open(self) -> None:
+        """
+        Create the schema and, for a fresh database, import the JSON store's data.
+        The seed includes the JSON store's write-ahead log, so mutations not yet
+        compacted into the snapshot are carried over too.
+        """
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        empty = conn.execute('SELECT 1 FROM patients LIMIT 1').fetchone() is None
+        if empty and self.seed_path:
+            seed = JSONPatientStore(self.seed_path).read_records()
+            with self._write_lock, conn:
+                conn.executemany(self._upsert_sql(), [self._row(pid, rec) for pid, rec in seed.items()])
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # In WAL mode NORMAL only fsyncs at checkpoints, which keeps commits cheap
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    # --------- Reads ---------
+    def get(self, patient_id: str) -> Optional[dict]:
+        row = self._conn().execute('SELECT data FROM patients WHERE id = ?', (patient_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def scan(
+        self,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        column = self._column(sort_by or 'id')
+        direction = 'DESC' if descending else 'ASC'
+        sql = 'SELECT id, data FROM patients'
+        params: list = []
+        if after is not None:
+            sql += f' WHERE ({column}, id) {"<" if descending else ">"} (?, ?)'
+            params.extend(after)
+        sql += f' ORDER BY {column} {direction}, id {direction}'
+        return self._fetch(sql, params, limit)
+
+    def query(
+        self,
+        equals: Optional[dict] = None,
+        ranges: Optional[dict] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        clauses, params = [], []
+        for field, value in (equals or {}).items():
+            clauses.append(f'{self._column(field)} = ?')
+            params.append(value)
+        for field, (low, high) in (ranges or {}).items():
+            if low is not None:
+                clauses.append(f'{self._column(field)} >= ?')
+                params.append(low)
+            if high is not None:
+                clauses.append(f'{self._column(field)} <= ?')
+                params.append(high)
+
+        if sort_by is not None:
+            clauses.append(f'{self._column(sort_by)} IS NOT NULL')
+
+        sql = 'SELECT id, data FROM patients'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        if sort_by is not None:
+            direction = 'DESC' if descending else 'ASC'
+            sql += f' ORDER BY {self._column(sort_by)} {direction}, id {direction}'
+        else:
+            sql += ' ORDER BY id'
+        return self._fetch(sql, params, limit)
+
+    def get_many(self, patient_ids: list[str]) -> dict[str, dict]:
+        found = {}
+        unique = list(dict.fromkeys(patient_ids))
+        # Chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            sql = f'SELECT id, data FROM patients WHERE id IN ({placeholders})'
+            found.update((pid, json.loads(data)) for pid, data in self._conn().execute(sql, chunk))
+        return found
+
+    def scan_keys(
+        self,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple]:
+        column = self._column(sort_by or 'id')
+        direction = 'DESC' if descending else 'ASC'
+        sql = f'SELECT {column}, id FROM patients'
+        params: list = []
+        if after is not None:
+            sql += f' WHERE ({column}, id) {"<" if descending else ">"} (?, ?)'
+            params.extend(after)
+        sql += f' ORDER BY {column} {direction}, id {direction}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return self._conn().execute(sql, params).fetchall()
+
+    def _fetch(self, sql: str, params: list, limit: Optional[int]) -> list[tuple[str, dict]]:
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params = [*params, limit]
+        rows = self._conn().execute(sql, params).fetchall()
+        return [(patient_id, json.loads(data)) for patient_id, data in rows]
+
+    @staticmethod
+    def _column(field: str) -> str:
+        # Column names cannot be bound as parameters, so only known names are ever interpolated
+        if field != 'id' and field not in INDEXED_COLUMNS:
+            raise ValueError(f'Unknown patient field {field!r}')
+        return field
+
+    # --------- Mutations ---------
+    def put(self, patient_id: str, record: dict) -> None:
+        self.write_batch([(patient_id, record)], [])
+
+    def delete(self, patient_id: str) -> None:
+        self.write_batch([], [patient_id])
+
+    def write_batch(self, puts: list[tuple[str, dict]], deletes: list[str]) -> None:
+        conn = self._conn()
+        with self._write_lock:
+            # Listeners get the previous records, which are only read back when someone listens
+            previous = self.get_many([pid for pid, _ in puts] + deletes) if self._listeners else {}
+            with conn:
+                conn.executemany(self._upsert_sql(), [self._row(pid, record) for pid, record in puts])
+                conn.executemany('DELETE FROM patients WHERE id = ?', [(pid,) for pid in deletes])
+            for pid, record in puts:
+                self._notify(pid, previous.get(pid), record)
+                previous[pid] = record
+            for pid in deletes:
+                if previous.get(pid) is not None:
+                    self._notify(pid, previous.pop(pid), None)
+
+    @staticmethod
+    def _upsert_sql() -> str:
+        columns = ', '.join(INDEXED_COLUMNS)
+        placeholders = ', '.join('?' for _ in INDEXED_COLUMNS)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in (*INDEXED_COLUMNS, 'data'))
+        return (
+            f'INSERT INTO patients (id, {columns}, data) VALUES (?, {placeholders}, ?) '
+            f'ON CONFLICT(id) DO UPDATE SET {updates}'
+        )
+
+    @staticmethod
+    def _row(patient_id: str, record: dict) -> tuple:
+        return (patient_id, *(record.get(column) for column in INDEXED_COLUMNS), json.dumps(record))
@@ -1,8 +1,37 @@
 import streamlit as st
 import requests
 
-# Set the FastAPI base URL
-BASE_URL = "http://127.0.0.1:8000"
+import api_client
+from api_client import APIError
+
+
+def show_paged(key: str, fetch) -> None:
+    """
+    Show patients one page at a time. The cursors of the pages visited so far are kept in
+    session state, so Previous/Next only fetch (or hit the cache for) a single page.
+    """
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    try:
+        page = fetch(cursors[-1])
+    except (APIError, requests.RequestException) as e:
+        st.error(f"Failed to fetch patient data: {e}")
+        return
+
+    patients = page["patients"]
+    rows = [{"id": patient_id, **record} for patient_id, record in patients.items()] if isinstance(patients, dict) else patients
+    if not rows:
+        st.info("No patients found.")
+    else:
+        st.dataframe(rows, use_container_width=True)
+    st.caption(f"Page {len(cursors)}")
+
+    previous_col, next_col = st.columns(2)
+    if previous_col.button("Previous", key=f"{key}_previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if next_col.button("Next", key=f"{key}_next", disabled=page["next_cursor"] is None):
+        cursors.append(page["next_cursor"])
+        st.rerun()
 
 # Streamlit app title
 st.title("Patient Management System")
@@ -17,35 +46,28 @@ if choice == "Home":
 
 elif choice == "View All Patients":
     st.subheader("View All Patients")
-    response = requests.get(f"{BASE_URL}/view")
-    if response.status_code == 200:
-        patients = response.json()
-        st.json(patients)
-    else:
-        st.error("Failed to fetch patient data.")
+    show_paged("view", lambda cursor: api_client.fetch_page(cursor))
 
 elif choice == "View Patient":
     st.subheader("View Patient by ID")
     patient_id = st.text_input("Enter Patient ID", "")
     if st.button("View Patient"):
-        response = requests.get(f"{BASE_URL}/patient/{patient_id}")
-        if response.status_code == 200:
-            patient = response.json()
-            st.json(patient)
+        try:
+            patient = api_client.fetch_patient(patient_id)
+        except (APIError, requests.RequestException) as e:
+            st.error(f"Failed to fetch patient: {e}")
         else:
-            st.error("Patient not found.")
+            if patient is not None:
+                st.json(patient)
+            else:
+                st.error("Patient not found.")
 
 elif choice == "Sort Patients":
     st.subheader("Sort Patients")
     sort_by = st.selectbox("Sort By", ["height", "weight", "bmi"])
     order = st.radio("Order", ["asc", "desc"])
-    if st.button("Sort"):
-        response = requests.get(f"{BASE_URL}/sort", params={"sort_by": sort_by, "order": order})
-        if response.status_code == 200:
-            sorted_patients = response.json()
-            st.json(sorted_patients)
-        else:
-            st.error("Failed to sort patients.")
+    # Each sort field and order pages independently
+    show_paged(f"sort_{sort_by}_{order}", lambda cursor: api_client.fetch_sorted_page(sort_by, order, cursor))
 
 elif choice == "Create Patient":
     st.subheader("Create New Patient")
@@ -67,11 +89,11 @@ elif choice == "Create Patient":
             "height": height,
             "weight": weight
         }
-        response = requests.post(f"{BASE_URL}/create", json=patient_data)
-        if response.status_code == 201:
+        try:
+            api_client.create_patient(patient_data)
             st.success("Patient created successfully.")
-        else:
-            st.error("Failed to create patient.")
+        except (APIError, requests.RequestException) as e:
+            st.error(f"Failed to create patient: {e}")
 
 elif choice == "Update Patient":
     st.subheader("Update Patient")
@@ -98,18 +120,18 @@ elif choice == "Update Patient":
         if weight > 0:
             update_data["weight"] = weight
 
-        response = requests.put(f"{BASE_URL}/edit/{patient_id}", json=update_data)
-        if response.status_code == 200:
+        try:
+            api_client.update_patient(patient_id, update_data)
             st.success("Patient updated successfully.")
-        else:
-            st.error("Failed to update patient.")
+        except (APIError, requests.RequestException) as e:
+            st.error(f"Failed to update patient: {e}")
 
 elif choice == "Delete Patient":
     st.subheader("Delete Patient")
     patient_id = st.text_input("Enter Patient ID to Delete")
     if st.button("Delete Patient"):
-        response = requests.delete(f"{BASE_URL}/delete/{patient_id}")
-        if response.status_code == 200:
+        try:
+            api_client.delete_patient(patient_id)
             st.success("Patient deleted successfully.")
-        else:
-            st.error("Failed to delete patient.")
+        except (APIError, requests.RequestException) as e:
+            st.error(f"Failed to delete patient: {e}")
@@ -0,0 +1,166 @@
+# Persistence tests for the patient stores: write-ahead log replay, compaction, restarts and seeding
+import os
+import threading
+import time
+
+import pytest
+
+import patient_table
+from patient_store import JSONPatientStore
+from sqlite_store import SQLitePatientStore
+
+RECORD = {'name': 'A', 'city': 'Pune', 'age': 30, 'gender': 'male', 'height': 1.7, 'weight': 70.0, 'bmi': 24.22, 'verdict': 'Normal'}
+
+
+def reopen(path, mode: str, **kwargs) -> JSONPatientStore:
+    store = JSONPatientStore(str(path), flush_interval=60, mode=mode, **kwargs)
+    store.open()
+    return store
+
+
+def test_wal_mode_replays_log_on_restart(tmp_path):
+    path = tmp_path / 'patients.json'
+    store = reopen(path, 'wal')
+    store.put('P1', {**RECORD, 'age': 40})
+    store.put('P2', RECORD)
+    store.delete('P2')
+    store.close()
+    assert os.path.getsize(f'{path}.wal') > 0
+
+    store = reopen(path, 'wal')
+    assert store.get('P1')['age'] == 40
+    assert 'P2' not in store
+    store.close()
+
+
+def test_compaction_folds_log_into_snapshot(tmp_path):
+    path = tmp_path / 'patients.json'
+    store = reopen(path, 'wal', compact_every=3)
+    for i in range(5):
+        store.put(f'P{i}', RECORD)
+        store.flush()
+    store.close()
+
+    store = reopen(path, 'snapshot')
+    assert len(store) == 5
+    store.close()
+
+
+def test_switching_wal_to_snapshot_does_not_replay_stale_log(tmp_path):
+    path = tmp_path / 'patients.json'
+    store = reopen(path, 'wal')
+    store.put('P1', {**RECORD, 'age': 40})
+    store.put('P2', RECORD)
+    store.close()
+
+    store = reopen(path, 'snapshot')
+    store.put('P1', {**RECORD, 'age': 50})
+    store.delete('P2')
+    store.close()
+    assert not os.path.exists(f'{path}.wal') or os.path.getsize(f'{path}.wal') == 0
+
+    for mode in ('snapshot', 'wal'):
+        store = reopen(path, mode)
+        assert store.get('P1')['age'] == 50
+        assert 'P2' not in store
+        store.close()
+
+
+def test_switching_snapshot_to_wal_keeps_snapshot(tmp_path):
+    path = tmp_path / 'patients.json'
+    store = reopen(path, 'snapshot')
+    store.put('P1', RECORD)
+    store.close()
+
+    store = reopen(path, 'wal')
+    store.put('P1', {**RECORD, 'age': 41})
+    store.close()
+
+    store = reopen(path, 'wal')
+    assert store.get('P1')['age'] == 41
+    store.close()
+
+
+def test_sqlite_seed_includes_write_ahead_log(tmp_path):
+    path = tmp_path / 'patients.json'
+    store = reopen(path, 'wal')
+    store.put('P1', RECORD)
+    store.put('P2', RECORD)
+    store.flush()
+    store.put('P1', {**RECORD, 'age': 40})
+    store.delete('P2')
+    store.put('P3', RECORD)
+    store.close()
+
+    sqlite = SQLitePatientStore(str(tmp_path / 'patients.db'), seed_path=str(path))
+    sqlite.open()
+    assert dict(sqlite.scan()) == JSONPatientStore(str(path)).read_records()
+    assert sqlite.get('P1')['age'] == 40 and 'P2' not in sqlite and 'P3' in sqlite
+    sqlite.close()
+
+
+def test_lock_free_reads_never_see_torn_or_moved_rows(tmp_path):
+    # Every field of a record is derived from (patient_id, generation), so a row read
+    # half-way through a write, or one moved by a delete, shows up as a mismatch
+    def record(patient_id: str, generation: int) -> dict:
+        age = 1 + (int(patient_id[1:]) + generation) % 100
+        return {**RECORD, 'name': f'{patient_id}/{generation}', 'age': age, 'weight': float(age), 'bmi': float(age)}
+
+    store = reopen(tmp_path / 'patients.json', 'wal')
+    ids = [f'P{i}' for i in range(200)]
+    store.write_batch([(patient_id, record(patient_id, 0)) for patient_id in ids], [])
+    stop = threading.Event()
+    errors = []
+
+    def write() -> None:
+        generation = 0
+        while not stop.is_set():
+            generation += 1
+            # Deleting early rows moves the last rows into their slots
+            store.write_batch([], ids[:20])
+            store.write_batch([(patient_id, record(patient_id, generation)) for patient_id in ids], [])
+
+    def read() -> None:
+        while not stop.is_set():
+            for patient_id, found in [(patient_id, store.get(patient_id)) for patient_id in ids[::7]]:
+                if found is not None and found != record(patient_id, int(found['name'].split('/')[1])):
+                    errors.append(found)
+            for patient_id, found in store.get_many(ids).items():
+                if found['name'].split('/')[0] != patient_id:
+                    errors.append(found)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1.0)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    store.close()
+    assert not errors, errors[:3]
+
+
+@pytest.mark.parametrize('indexed_fraction', [0.0, 1.0], ids=['column-scan', 'row-index'])
+def test_equality_queries_follow_rows_moved_by_deletes(tmp_path, monkeypatch, indexed_fraction):
+    monkeypatch.setattr(patient_table, 'INDEXED_MATCH_MAX_FRACTION', indexed_fraction)
+    cities = ['Pune', 'Delhi', 'Jaipur']
+    store = reopen(tmp_path / 'patients.json', 'wal')
+    store.write_batch([(f'P{i}', {**RECORD, 'city': cities[i % 3], 'age': i}) for i in range(30)], [])
+    assert [patient_id for patient_id, _ in store.query({'city': 'Jaipur'})] == sorted(f'P{i}' for i in range(2, 30, 3))
+
+    # Each delete moves the last row into the freed slot, and edits change a row's city
+    store.write_batch([('P1', {**RECORD, 'city': 'Jaipur', 'age': 1}), ('P30', {**RECORD, 'city': 'Agra', 'age': 30})], [])
+    for patient_id in ('P0', 'P5', 'P11', 'P3', 'P29'):
+        store.delete(patient_id)
+    expected = {
+        city: sorted(patient_id for patient_id, record in store.to_dict().items() if record['city'] == city)
+        for city in cities + ['Agra']
+    }
+    for city, ids in expected.items():
+        assert [patient_id for patient_id, _ in store.query({'city': city})] == ids
+        assert [patient_id for patient_id, _ in store.query({'city': city, 'gender': 'male'}, {'age': (0, 20)})] == [
+            patient_id for patient_id in ids if store.get(patient_id)['age'] <= 20
+        ]
+    assert 'P1' in expected['Jaipur'] and expected['Agra'] == ['P30']
+    assert store.query({'city': 'Mumbai'}) == []
+    store.close()
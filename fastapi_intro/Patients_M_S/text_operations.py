@@ -0,0 +1,287 @@
+# Registry of text operations and a compiler that turns a chain of them into one callable
+import multiprocessing
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from typing import Any, Callable, Optional
+
+# Kinds of value flowing between operations
+TEXT, TOKENS, COUNTS = 'text', 'tokens', 'counts'
+DEFAULT_TOKEN_PATTERN = r'\w+'
+
+
+class Operation:
+    """
+    One registered operation. `factory(**params)` returns the function applied per input;
+    it runs once per chain compilation, so regexes and other setup are paid only once.
+    """
+
+    def __init__(self, name: str, factory: Callable, accepts: str, returns: str,
+                 idempotent: bool, heavy: bool, streamable: bool):
+        self.name = name
+        self.factory = factory
+        self.accepts = accepts
+        self.returns = returns
+        # Applying it twice in a row is the same as once, so repeats can be dropped
+        self.idempotent = idempotent
+        # CPU-heavy enough that large batches are worth sending to worker processes
+        self.heavy = heavy
+        # Gives the same result applied to arbitrary chunks of a document as to the whole
+        self.streamable = streamable
+        self.description = (factory.__doc__ or '').strip()
+
+
+OPERATIONS: dict[str, Operation] = {}
+
+
+def register_operation(name: str, accepts: str = TEXT, returns: str = TEXT,
+                       idempotent: bool = False, heavy: bool = False, streamable: bool = False):
+    """
+    Decorator adding an operation factory to the registry under `name`.
+    """
+    def decorator(factory: Callable) -> Callable:
+        OPERATIONS[name] = Operation(name, factory, accepts, returns, idempotent, heavy, streamable)
+        return factory
+    return decorator
+
+
+def _check_type(name: str, value: Any, expected: type) -> None:
+    # bool is an int subclass, but {"count": true} is a mistake rather than 1
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        raise ValueError(f'{name} must be {"an integer" if expected is int else f"a {expected.__name__}"}')
+
+
+# --------- Built-in operations ---------
+@register_operation('casefold', idempotent=True, streamable=True)
+def _casefold():
+    """Aggressive lowercasing for caseless matching (e.g. 'ß' -> 'ss')."""
+    return str.casefold
+
+
+@register_operation('lowercase', idempotent=True, streamable=True)
+def _lowercase():
+    """Convert text to lowercase."""
+    return str.lower
+
+
+@register_operation('uppercase', idempotent=True, streamable=True)
+def _uppercase():
+    """Convert text to uppercase."""
+    return str.upper
+
+
+@register_operation('strip', idempotent=True)
+def _strip():
+    """Remove leading and trailing whitespace."""
+    return str.strip
+
+
+@register_operation('normalize_whitespace', idempotent=True)
+def _normalize_whitespace():
+    """Collapse runs of whitespace to single spaces and trim the ends."""
+    return lambda text: ' '.join(text.split())
+
+
+@register_operation('regex_replace', heavy=True)
+def _regex_replace(pattern: str, replacement: str = '', ignore_case: bool = False, count: int = 0):
+    """Replace matches of `pattern` with `replacement` (re.sub syntax)."""
+    _check_type('pattern', pattern, str)
+    _check_type('replacement', replacement, str)
+    _check_type('ignore_case', ignore_case, bool)
+    _check_type('count', count, int)
+    if count < 0:
+        raise ValueError('count must be >= 0')
+    regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    try:
+        # Group references in the template are only checked once something matches, so check them now
+        regex.sub(replacement, '')
+    except (re.error, IndexError) as e:
+        raise ValueError(f'invalid replacement: {e}')
+    return lambda text: regex.sub(replacement, text, count)
+
+
+@register_operation('tokenize', returns=TOKENS, heavy=True)
+def _tokenize(pattern: str = DEFAULT_TOKEN_PATTERN):
+    """Split text into the substrings matching `pattern` (words by default)."""
+    _check_type('pattern', pattern, str)
+    regex = re.compile(pattern)
+    if regex.groups:
+        # findall would return group tuples; keep whole matches instead
+        return lambda text: [match.group(0) for match in regex.finditer(text)]
+    return regex.findall
+
+
+@register_operation('ngrams', accepts=TOKENS, returns=TOKENS, heavy=True)
+def _ngrams(n: int = 2, separator: str = ' '):
+    """Join every run of `n` consecutive tokens with `separator`."""
+    _check_type('n', n, int)
+    _check_type('separator', separator, str)
+    if n < 1:
+        raise ValueError('n must be >= 1')
+    return lambda tokens: [separator.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+
+@register_operation('word_counts', accepts=TOKENS, returns=COUNTS, heavy=True)
+def _word_counts(top: Optional[int] = None):
+    """Count token occurrences; `top` keeps only the most common."""
+    if top is None:
+        return lambda tokens: dict(Counter(tokens))
+    _check_type('top', top, int)
+    if top < 1:
+        raise ValueError('top must be >= 1')
+    return lambda tokens: dict(Counter(tokens).most_common(top))
+
+
+# --------- Chain compilation ---------
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def canonical_spec(operations: list[dict]) -> tuple:
+    """
+    Hashable form of a chain: ((name, ((param, value), ...)), ...), used as the cache key.
+    Each operation is a dict like {'op': 'regex_replace', 'pattern': '\\d+', 'replacement': '#'}.
+    """
+    spec = []
+    for operation in operations:
+        params = dict(operation)
+        name = params.pop('op', None)
+        if not isinstance(name, str):
+            raise ValueError('Each operation needs an "op" name')
+        spec.append((name, _freeze(params)))
+    return tuple(spec)
+
+
+class CompiledChain:
+    """
+    A validated, optimised chain of operations, callable on one text.
+    """
+
+    def __init__(self, spec: tuple, steps: list[tuple[Operation, dict]]):
+        self.spec = spec
+        self.steps = [operation.name for operation, _ in steps]
+        self.returns = steps[-1][0].returns if steps else TEXT
+        self.heavy = any(operation.heavy for operation, _ in steps)
+        self.streamable = all(operation.streamable for operation, _ in steps)
+
+        functions = []
+        for operation, params in steps:
+            try:
+                functions.append(operation.factory(**params))
+            except TypeError as e:
+                # Drop the factory's own name from messages like "_ngrams() got an unexpected keyword"
+                reason = str(e).split('() ', 1)[-1]
+                raise ValueError(f'Invalid parameters for {operation.name!r}: {reason}')
+            except re.error as e:
+                raise ValueError(f'Invalid pattern for {operation.name!r}: {e}')
+            except ValueError as e:
+                raise ValueError(f'Invalid parameters for {operation.name!r}: {e}')
+        self._functions = tuple(functions)
+
+    def __call__(self, text: str) -> Any:
+        value = text
+        for function in self._functions:
+            value = function(value)
+        return value
+
+
+def _optimise(steps: list[tuple[Operation, dict]]) -> list[tuple[Operation, dict]]:
+    """
+    Insert implicit tokenisation, reject mistyped chains and drop steps that cannot change the result.
+    """
+    typed = []
+    kind = TEXT
+    for operation, params in steps:
+        if operation.accepts == TOKENS and kind == TEXT:
+            # e.g. [word_counts] on raw text means "count the words"
+            typed.append((OPERATIONS['tokenize'], {}))
+            kind = TOKENS
+        if operation.accepts != kind:
+            raise ValueError(f'{operation.name!r} expects {operation.accepts} but the chain produces {kind} at that point')
+        typed.append((operation, params))
+        kind = operation.returns
+
+    optimised = []
+    for operation, params in typed:
+        if optimised and operation.idempotent and optimised[-1] == (operation, params):
+            continue
+        # The default word tokenizer ignores whitespace, so tidying it first is wasted work
+        if operation.name == 'tokenize' and params.get('pattern', DEFAULT_TOKEN_PATTERN) == DEFAULT_TOKEN_PATTERN:
+            while optimised and optimised[-1][0].name in ('strip', 'normalize_whitespace'):
+                optimised.pop()
+        optimised.append((operation, params))
+    return optimised
+
+
+@lru_cache(maxsize=256)
+def compile_chain(spec: tuple) -> CompiledChain:
+    """
+    Compile a canonical spec once; repeated requests with the same chain reuse the result.
+    Raises ValueError for unknown operations, bad parameters or mistyped chains.
+    """
+    steps = []
+    for name, params in spec:
+        operation = OPERATIONS.get(name)
+        if operation is None:
+            raise ValueError(f'Unknown operation {name!r}; available: {", ".join(sorted(OPERATIONS))}')
+        steps.append((operation, dict(params)))
+    return CompiledChain(spec, _optimise(steps))
+
+
+# --------- Batch execution ---------
+def _run_chunk(spec: tuple, texts: list[str]) -> list:
+    # Runs in a worker process, which compiles (and caches) the chain itself
+    chain = compile_chain(spec)
+    return [chain(text) for text in texts]
+
+
+def _ready() -> bool:
+    return True
+
+
+class TextWorkerPool:
+    """
+    Runs batches through a compiled chain, fanning large CPU-heavy batches out to worker processes.
+    Light chains and small batches stay in-process, where pickling would cost more than it saves.
+    """
+
+    def __init__(self, workers: int = os.cpu_count() or 1, min_chars: int = 1_000_000):
+        self.workers = workers
+        self.min_chars = min_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        """
+        Start the worker processes; until then every batch runs in-process.
+        Workers are spawned rather than forked, since the API process is multi-threaded
+        and the workers only need this module, not any of its state.
+        """
+        if self.workers <= 1:
+            return
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        # Spawn the workers now rather than on the first large batch
+        for future in [self._executor.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+
+    def map(self, chain: CompiledChain, texts: list[str]) -> list:
+        if self._executor is None or not chain.heavy or sum(map(len, texts)) < self.min_chars:
+            return [chain(text) for text in texts]
+        # A few chunks per worker evens out texts of different lengths
+        size = max(1, -(-len(texts) // (self.workers * 4)))
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        results = []
+        for chunk_results in self._executor.map(_run_chunk, repeat(chain.spec), chunks):
+            results.extend(chunk_results)
+        return results
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
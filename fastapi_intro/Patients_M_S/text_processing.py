@@ -1,31 +1,207 @@
-from fastapi import FastAPI , HTTPException
-from pydantic import BaseModel
-from typing import List, Dict,Optional
+from fastapi import FastAPI , HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, ConfigDict, ValidationError
+from typing import AsyncIterator, List, Dict,Optional, Union
+from contextlib import asynccontextmanager
+import codecs
+import json
+import os
 import uvicorn
 
+from text_operations import OPERATIONS, CompiledChain, TextWorkerPool, canonical_spec, compile_chain
+
+# Streaming settings: processed text is emitted in pieces of at least this many characters
+STREAM_CHUNK_CHARS = 64 * 1024
+
+# Batch settings: CPU-heavy chains over at least TEXT_POOL_MIN_CHARS characters run in worker processes
+TEXT_WORKERS = int(os.environ.get('TEXT_WORKERS', str(os.cpu_count() or 1)))
+TEXT_POOL_MIN_CHARS = int(os.environ.get('TEXT_POOL_MIN_CHARS', '1000000'))
+
+pool = TextWorkerPool(workers=TEXT_WORKERS, min_chars=TEXT_POOL_MIN_CHARS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pool.start()
+    yield
+    pool.shutdown()
 
 # Import FastAPI class from fastapi package
 # Create FastAPI app instance with metadata
 app = FastAPI(
     title="Text Processing API",
     description="API for processing text with various operations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 
 # define pydantic models for request and response pameters
+class TextOperation(BaseModel):
+    # Operation parameters are passed as extra fields, e.g. {"op": "ngrams", "n": 3}
+    model_config = ConfigDict(extra='allow')
+
+    op: str
+
 class TextRequest(BaseModel):
     text: str
     uppercase: Optional[bool] = False
+    operations: Optional[List[TextOperation]] = None
 
 class TextResponse(BaseModel):
-    processed: str
+    # text for text operations, a token list after tokenize/ngrams, counts after word_counts
+    processed: Union[str, List[str], Dict[str, int]]
     length: int
 
+class TextBatchRequest(BaseModel):
+    texts: List[str]
+    uppercase: Optional[bool] = False
+    operations: Optional[List[TextOperation]] = None
+
+class TextBatchResponse(BaseModel):
+    results: List[TextResponse]
+    total_length: int
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for generators that are still reading the request body.
+    The stock class listens for client disconnects on `receive` while streaming, which would
+    race the body reader for request messages; here a disconnect surfaces from the body reader
+    (ClientDisconnect) or from `send` instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+def build_chain(operations: Optional[List[TextOperation]], uppercase: Optional[bool]) -> CompiledChain:
+    """
+    Compiled (and cached) chain for a request. `uppercase` is shorthand for a leading
+    uppercase step. Raises ValueError for an invalid chain.
+    """
+    specs = [{'op': 'uppercase'}] if uppercase else []
+    specs += [operation.model_dump() for operation in operations or []]
+    return compile_chain(canonical_spec(specs))
+
+def request_chain(operations: Optional[List[TextOperation]], uppercase: Optional[bool]) -> CompiledChain:
+    try:
+        return build_chain(operations, uppercase)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def ndjson_line(item: dict) -> bytes:
+    return (json.dumps(item) + '\n').encode()
+
+async def stream_document(chunks: AsyncIterator[bytes], chain: CompiledChain) -> AsyncIterator[bytes]:
+    """
+    Process a raw UTF-8 body piece by piece as it arrives, never holding the whole document.
+    Yields one NDJSON line per processed piece with the running length so far, then a summary.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = []
+    pending_chars = 0
+    index = 0
+    running_length = 0
+
+    def emit(text: str) -> bytes:
+        nonlocal index, running_length
+        processed = chain(text)
+        running_length += len(processed)
+        line = ndjson_line({'chunk': index, 'processed': processed, 'length': len(processed), 'running_length': running_length})
+        index += 1
+        return line
+
+    try:
+        async for chunk in chunks:
+            text = decoder.decode(chunk)
+            if not text:
+                continue
+            pending.append(text)
+            pending_chars += len(text)
+            # Coalesce small network reads into pieces of about STREAM_CHUNK_CHARS
+            if pending_chars >= STREAM_CHUNK_CHARS:
+                yield await run_in_threadpool(emit, ''.join(pending))
+                pending, pending_chars = [], 0
+        tail = ''.join(pending) + decoder.decode(b'', final=True)
+    except UnicodeDecodeError as e:
+        # Headers are already sent, so errors are reported in-band
+        yield ndjson_line({'error': f'Body is not valid UTF-8: {e.reason}'})
+        return
+    if tail:
+        yield await run_in_threadpool(emit, tail)
+    if index == 0:
+        yield ndjson_line({'error': 'Text cannot be empty'})
+        return
+    yield ndjson_line({'done': True, 'chunks': index, 'total_length': running_length})
+
+async def stream_texts(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Process an NDJSON body of TextRequest objects line by line as it arrives.
+    Yields one result (or error) line per input line with the running length, then a summary.
+    """
+    # Pieces of the current, still unterminated line; only new chunks are searched for newlines
+    pieces: list[bytes] = []
+    index = 0
+    running_length = 0
+    failed = 0
+
+    def process(line: bytes) -> bytes:
+        nonlocal index, running_length, failed
+        try:
+            request = TextRequest.model_validate_json(line)
+            if not request.text:
+                raise ValueError('Text cannot be empty')
+            # Lines sharing a chain hit the compile cache
+            chain = build_chain(request.operations, request.uppercase)
+        except (ValidationError, ValueError) as e:
+            failed += 1
+            result = {'index': index, 'error': str(e)}
+        else:
+            processed = chain(request.text)
+            running_length += len(processed)
+            result = {'index': index, 'processed': processed, 'length': len(processed), 'running_length': running_length}
+        index += 1
+        return ndjson_line(result)
+
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b'\n', start)) != -1:
+            pieces.append(chunk[start:end])
+            line = b''.join(pieces)
+            pieces = []
+            if line.strip():
+                # Validation and the chain run off the event loop, so a long line cannot stall other requests
+                yield await run_in_threadpool(process, line)
+            start = end + 1
+        if start < len(chunk):
+            pieces.append(chunk[start:])
+    line = b''.join(pieces)
+    if line.strip():
+        yield await run_in_threadpool(process, line)
+    yield ndjson_line({'done': True, 'items': index, 'failed': failed, 'total_length': running_length})
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Text Processing API!"}
 
+# list the available operations
+@app.get("/operations")
+def list_operations():
+    """
+    Describe every registered text operation and what it consumes and produces.
+    """
+    return {
+        name: {'description': operation.description, 'accepts': operation.accepts, 'returns': operation.returns}
+        for name, operation in OPERATIONS.items()
+    }
+
 # define a route endpoint for processing text
 @app.post("/process_text", response_model=TextResponse)
 # Process the input text based on the request parameters
@@ -33,8 +209,9 @@ def read_root():
 def process_text(request: TextRequest):
     """
     Process the input text based on the request parameters.
-    If uppercase is True, convert text to uppercase.
-    Return processed text and its length.
+    If uppercase is True, convert text to uppercase; `operations` chains further
+    operations (see /operations), e.g. [{"op": "casefold"}, {"op": "word_counts"}].
+    Return processed result and its length.
     """
     text= request.text
     # Check if the text is empty
@@ -42,12 +219,53 @@ def process_text(request: TextRequest):
     if not text:
         raise HTTPException(status_code=400, detail="Text cannot be empty")
     # Process the text based on the request parameters
-    # If uppercase is True, convert text to uppercase
-    processed_text = text.upper() if request.uppercase else text
+    chain = request_chain(request.operations, request.uppercase)
+    processed_text = chain(text)
     
     response=TextResponse(processed=processed_text, length=len(processed_text))
     return response
 
+# define a route endpoint for processing many texts in one call
+@app.post("/process_text/batch", response_model=TextBatchResponse)
+def process_text_batch(request: TextBatchRequest):
+    """
+    Process a list of texts with the same options in a single request.
+    The chain is compiled once; large batches of CPU-heavy operations are spread over
+    worker processes. Results are returned in input order together with the total processed length.
+    """
+    for i, text in enumerate(request.texts):
+        if not text:
+            raise HTTPException(status_code=400, detail=f"Text at index {i} cannot be empty")
+    chain = request_chain(request.operations, request.uppercase)
+    results = []
+    total_length = 0
+    for processed_text in pool.map(chain, request.texts):
+        total_length += len(processed_text)
+        results.append(TextResponse(processed=processed_text, length=len(processed_text)))
+    return TextBatchResponse(results=results, total_length=total_length)
+
+# define a route endpoint for streaming large inputs through the processor
+@app.post("/process_text/stream")
+async def process_text_stream(request: Request, uppercase: bool = False, ops: Optional[str] = None):
+    """
+    Stream text through the processor without buffering the request body.
+    - Content-Type application/x-ndjson: one TextRequest object per line; each line is
+      answered with its own result line (the query parameters are ignored).
+    - Any other body (e.g. `curl --data-binary @document.txt`) is treated as one UTF-8
+      document and processed chunk by chunk. `ops` is a comma-separated list of
+      chunk-safe operations, e.g. ?ops=casefold.
+    Every output line carries the running length; the last line is a summary.
+    """
+    if 'ndjson' in request.headers.get('content-type', ''):
+        body = stream_texts(request.stream())
+    else:
+        operations = [TextOperation(op=name.strip()) for name in ops.split(',') if name.strip()] if ops else None
+        chain = request_chain(operations, uppercase)
+        if not chain.streamable:
+            raise HTTPException(status_code=400, detail='Only per-character operations can be applied to a streamed document')
+        body = stream_document(request.stream(), chain)
+    return DuplexStreamingResponse(body, media_type='application/x-ndjson')
+
 # Endpoint to get the length of the text
 if __name__ == "__main__":
 
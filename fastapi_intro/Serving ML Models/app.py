@@ -1,25 +1,131 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI
 from pydantic import BaseModel, Field, computed_field
 from typing import Literal, Annotated
-import pickle
+from contextlib import asynccontextmanager
+import os
+import sys
 import pandas as pd
 import uvicorn
-# import the ml model
-with open('model.pkl', 'rb') as f:
-    model = pickle.load(f)
-
-app = FastAPI()
-
-tier_1_cities = ["Mumbai", "Delhi", "Bangalore", "Chennai", "Kolkata", "Hyderabad", "Pune"]
-tier_2_cities = [
-    "Jaipur", "Chandigarh", "Indore", "Lucknow", "Patna", "Ranchi", "Visakhapatnam", "Coimbatore",
-    "Bhopal", "Nagpur", "Vadodara", "Surat", "Rajkot", "Jodhpur", "Raipur", "Amritsar", "Varanasi",
-    "Agra", "Dehradun", "Mysore", "Jabalpur", "Guwahati", "Thiruvananthapuram", "Ludhiana", "Nashik",
-    "Allahabad", "Udaipur", "Aurangabad", "Hubli", "Belgaum", "Salem", "Vijayawada", "Tiruchirappalli",
-    "Bhavnagar", "Gwalior", "Dhanbad", "Bareilly", "Aligarh", "Gaya", "Kozhikode", "Warangal",
-    "Kolhapur", "Bilaspur", "Jalandhar", "Noida", "Guntur", "Asansol", "Siliguri"
-]
+
+# Modules shared by the apps in fastapi_intro live in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'common'))
+
+from batching import MicroBatcher
+from inference_pool import InferencePool
+from json_fastpath import FastJSONResponse, json_body, openapi_body
+from features import FEATURE_COLUMNS, RAW_COLUMNS, age_group, build_features, city_tiers, lifestyle_risk
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+
+# micro-batching settings for /predict
+MAX_BATCH_SIZE = int(os.environ.get('PREDICT_MAX_BATCH_SIZE', '32'))
+MAX_WAIT_MS = float(os.environ.get('PREDICT_MAX_WAIT_MS', '2'))
+
+# worker processes for model inference; 0 scores in-process on a thread
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '0'))
+
+# model registry settings: newest file in MODEL_DIR wins, model.pkl is the fallback
+MODEL_DIR = os.environ.get('MODEL_DIR', 'models')
+MODEL_POLL_INTERVAL = float(os.environ.get('MODEL_POLL_INTERVAL', '5'))
+MODEL_CANARY_PERCENT = float(os.environ.get('MODEL_CANARY_PERCENT', '0'))
+
+# prediction cache settings; unset quantisation steps mean exact feature matches
+def optional_float(name: str):
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+cache = PredictionCache(
+    max_bytes=int(os.environ.get('PREDICTION_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', '300')),
+    bmi_step=optional_float('PREDICTION_CACHE_BMI_STEP'),
+    income_step=optional_float('PREDICTION_CACHE_INCOME_STEP'),
+)
+
+# the ml model: loaded at startup, hot-reloaded when a new version lands in MODEL_DIR
+registry = ModelRegistry(
+    model_dir=MODEL_DIR,
+    fallback_path='model.pkl',
+    poll_interval=MODEL_POLL_INTERVAL,
+    canary_percent=MODEL_CANARY_PERCENT,
+    on_change=cache.clear,
+)
+
+pool = InferencePool(INFERENCE_WORKERS) if INFERENCE_WORKERS > 0 else None
+
+def score_records(version, records: list) -> list:
+    if pool is not None:
+        return pool.predict_records(version, records)
+    return version.predict_records(records)
+
+def score_frame(version, features: pd.DataFrame) -> list:
+    if pool is not None:
+        return pool.predict_frame(version, features)
+    return version.predict_frame(features)
+
+def feature_record(data) -> dict:
+    """
+    The six derived features the model consumes, read from a validated UserInput.
+    """
+    return {column: getattr(data, column) for column in FEATURE_COLUMNS}
+
+def predict_categories(items: list) -> list:
+    """
+    Score one micro-batch of (UserInput, ModelVersion) pairs by filling preallocated
+    feature rows straight from the inputs' derived fields; one model call per version.
+    """
+    predictions = [None] * len(items)
+    by_version: dict = {}
+    for i, (data, version) in enumerate(items):
+        by_version.setdefault(version, []).append(i)
+    for version, indexes in by_version.items():
+        scored = score_records(version, [feature_record(items[i][0]) for i in indexes])
+        for i, prediction in zip(indexes, scored):
+            predictions[i] = prediction
+    return predictions
+
+def predict_categories_vectorised(inputs: list) -> list:
+    """
+    Score a large batch: derive features column-wise, answer repeats from the cache,
+    then one model call for the rest.
+    """
+    version = registry.choose()
+    raw_df = pd.DataFrame({column: [getattr(item, column) for item in inputs] for column in RAW_COLUMNS})
+    features = build_features(raw_df)
+    records = features.to_dict('records')
+    predictions = [cache.get(record, version.key) for record in records]
+    missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+    if not missing:
+        return predictions
+
+    scored = score_frame(version, features.iloc[missing])
+    for i, prediction in zip(missing, scored):
+        predictions[i] = prediction
+        cache.put(records[i], version.key, prediction)
+    return predictions
+
+# one micro-batch in flight per inference process keeps every worker busy
+batcher = MicroBatcher(
+    predict_categories,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_WAIT_MS,
+    max_in_flight=max(1, INFERENCE_WORKERS),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if pool is not None:
+        # Fork the workers after the model is loaded but before the registry watcher thread starts
+        registry.refresh()
+        pool.start(preload=registry.active)
+    registry.open()
+    await batcher.start()
+    yield
+    await batcher.stop()
+    registry.close()
+    if pool is not None:
+        pool.stop()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # pydantic model to validate incoming data
 class UserInput(BaseModel):
@@ -41,53 +147,77 @@ class UserInput(BaseModel):
     @computed_field
     @property
     def lifestyle_risk(self) -> str:
-        if self.smoker and self.bmi > 30:
-            return "high"
-        elif self.smoker or self.bmi > 27:
-            return "medium"
-        else:
-            return "low"
+        return lifestyle_risk(self.smoker, self.bmi)
         
     @computed_field
     @property
     def age_group(self) -> str:
-        if self.age < 25:
-            return "young"
-        elif self.age < 45:
-            return "adult"
-        elif self.age < 60:
-            return "middle_aged"
-        return "senior"
+        return age_group(self.age)
     
     @computed_field
     @property
     def city_tier(self) -> int:
-        if self.city in tier_1_cities:
-            return 1
-        elif self.city in tier_2_cities:
-            return 2
-        else:
-            return 3
-
-@app.post('/predict')
-def predict_premium(data: UserInput):
+        return city_tiers.lookup(self.city)
+
+@app.post('/predict', openapi_extra=openapi_body(UserInput))
+async def predict_premium(data: UserInput = Depends(json_body(UserInput))):
     try:
-        input_df = pd.DataFrame([{
-            'bmi': data.bmi,
-            'age_group': data.age_group,
-            'lifestyle_risk': data.lifestyle_risk,
-            'city_tier': data.city_tier,
-            'income_lpa': data.income_lpa,
-            'occupation': data.occupation
-        }])
-
-        prediction = model.predict(input_df)[0]
-
-        return JSONResponse(status_code=200, content={'predicted_category': prediction})
+        # Repeated quotes are answered from the cache without touching sklearn
+        version = registry.choose()
+        features = feature_record(data)
+        prediction = cache.get(features, version.key)
+        if prediction is None:
+            # Coalesced with concurrent requests into one model.predict call
+            prediction = await batcher.submit((data, version))
+            cache.put(features, version.key, prediction)
+
+        return FastJSONResponse(status_code=200, content={'predicted_category': prediction})
+    except ValueError as e:
+        return FastJSONResponse(status_code=400, content={"error": f"Invalid input: {e}"})
+    except Exception as e:
+        return FastJSONResponse(status_code=500, content={"error": f"An unexpected error occurred: {e}"})
+
+@app.post('/predict/batch', openapi_extra=openapi_body(UserInput, many=True))
+def predict_premium_batch(data: list[UserInput] = Depends(json_body(UserInput, many=True))):
+    """
+    Score many applicants with one feature frame and a single model.predict call.
+    Predictions are returned in the same order as the inputs.
+    """
+    if not data:
+        return FastJSONResponse(status_code=200, content={'predicted_categories': []})
+    try:
+        predictions = predict_categories_vectorised(data)
+
+        return FastJSONResponse(status_code=200, content={'predicted_categories': predictions})
     except ValueError as e:
-        return JSONResponse(status_code=400, content={"error": f"Invalid input: {e}"})
+        return FastJSONResponse(status_code=400, content={"error": f"Invalid input: {e}"})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": f"An unexpected error occurred: {e}"})
+        return FastJSONResponse(status_code=500, content={"error": f"An unexpected error occurred: {e}"})
+
+@app.get('/metrics')
+def metrics():
+    """
+    Report micro-batching statistics (including the achieved batch size) and cache counters.
+    """
+    return {'batching': batcher.stats(), 'cache': cache.stats()}
+
+@app.get('/model')
+def model_info():
+    """
+    Report the active model version, its load time and any canary candidate.
+    """
+    return registry.info()
+
+@app.post('/model/promote')
+def promote_model():
+    """
+    Promote the canary candidate to be the active model.
+    """
+    try:
+        registry.promote()
+    except ValueError as e:
+        return FastJSONResponse(status_code=400, content={"error": str(e)})
+    return registry.info()
 
 if __name__ == "__main__":
     """
@@ -0,0 +1,127 @@
+# Server-side micro-batching: coalesce concurrent single predictions into one model call
+import asyncio
+from typing import Any, Callable, Optional
+
+
+class MicroBatcher:
+    """
+    Queue individual requests and run them through `predict_fn` in batches.
+    A batch is flushed when it reaches max_batch_size or when the oldest queued
+    request has waited max_wait_ms, whichever comes first. The model runs in a
+    worker thread so the event loop keeps accepting requests meanwhile; up to
+    max_in_flight batches may be scoring at once (e.g. one per inference process).
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[list], list],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        max_in_flight: int = 1,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_in_flight = max_in_flight
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Requests taken off the queue for the batch being collected, not yet scoring
+        self._collecting: list = []
+        self._in_flight: set[asyncio.Task] = set()
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop collecting and answer every caller: the batch being collected and anything
+        still queued are scored in final batches, and batches already scoring finish.
+        """
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        pending, self._collecting = self._collecting, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for start in range(0, len(pending), self.max_batch_size):
+            await self._dispatch(pending[start:start + self.max_batch_size])
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one item and wait for its prediction.
+        """
+        if self._worker is None:
+            raise RuntimeError('MicroBatcher is not running')
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'max_in_flight': self.max_in_flight,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._collecting = batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._dispatch(batch)
+            self._collecting = []
+
+    async def _dispatch(self, batch: list) -> None:
+        # Wait for a free slot, then score in the background so the caller can carry on collecting
+        await self._slots.acquire()
+        task = asyncio.create_task(self._score(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _score(self, batch: list) -> None:
+        try:
+            items = [item for item, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.predict_fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, future), result in zip(batch, results):
+                # A caller that disconnected has a cancelled future; skip it
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
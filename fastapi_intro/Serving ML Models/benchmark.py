@@ -0,0 +1,269 @@
+# Latency / throughput benchmark for the insurance premium API
+#
+# Replays applicants from insurance.csv against /predict (or /predict/batch), either
+# in-process through httpx's ASGI transport or against a uvicorn server started for
+# the run, and times the request stages in isolation. Results are printed as JSON so
+# runs can be diffed between optimisations.
+#
+# Run from this directory:
+#   python benchmark.py --mode both --requests 2000 --concurrency 32 --output bench.json
+#
+# The prediction cache is disabled unless --cache is given, so the model is exercised.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+DATA_FILE = 'insurance.csv'
+TARGET_COLUMN = 'insurance_premium_category'
+
+
+# --------- Measurement helpers ---------
+def summarise(latencies: list[float], elapsed: float) -> dict:
+    """
+    Latency percentiles in milliseconds plus achieved throughput.
+    """
+    ms = np.asarray(latencies) * 1000
+    return {
+        'requests': len(ms),
+        'seconds': round(elapsed, 4),
+        'rps': round(len(ms) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+    }
+
+
+def rss_mb(pid: str = 'self') -> Optional[float]:
+    """
+    Current resident set size; falls back to the peak RSS where /proc is unavailable.
+    None for another process when /proc is unavailable, since its peak cannot be read either.
+    """
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid != 'self':
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def load_payloads(path: str, n: int, batch_size: int) -> list:
+    """
+    Request bodies cycled from the CSV: single applicants, or lists of batch_size applicants.
+    """
+    rows = pd.read_csv(path).drop(columns=[TARGET_COLUMN]).to_dict('records')
+    if batch_size <= 1:
+        return [rows[i % len(rows)] for i in range(n)]
+    return [[rows[(i * batch_size + j) % len(rows)] for j in range(batch_size)] for i in range(n)]
+
+
+async def drive(client, url: str, payloads: list, concurrency: int) -> dict:
+    """
+    Send every payload with at most `concurrency` requests in flight and time each one.
+    """
+    latencies = []
+    failures = 0
+    queue = iter(payloads)
+
+    async def worker():
+        nonlocal failures
+        for payload in queue:
+            started = time.perf_counter()
+            response = await client.post(url, json=payload)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarise(latencies, time.perf_counter() - started)
+    result['failures'] = failures
+    return result
+
+
+# --------- Runners ---------
+async def run_inprocess(args, payloads: list) -> dict:
+    import httpx
+
+    import app as api
+
+    rss_before = rss_mb()
+    async with api.lifespan(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            await drive(client, args.endpoint, payloads[:args.warmup], args.concurrency)
+            result = await drive(client, args.endpoint, payloads, args.concurrency)
+            result['server_metrics'] = (await client.get('/metrics')).json()
+    result['rss_mb_before'] = rss_before
+    result['rss_mb_after'] = rss_mb()
+    return result
+
+
+async def run_uvicorn(args, payloads: list) -> dict:
+    import httpx
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app:app', '--port', str(args.port),
+         '--workers', str(args.workers), '--log-level', 'warning'],
+        env=os.environ.copy(),
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            deadline = time.monotonic() + args.startup_timeout
+            started = time.perf_counter()
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f'uvicorn exited with code {server.returncode}')
+                try:
+                    if (await client.get('/model')).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f'uvicorn did not become ready within {args.startup_timeout}s')
+                await asyncio.sleep(0.05)
+            startup_seconds = time.perf_counter() - started
+
+            await drive(client, args.endpoint, payloads[:args.warmup], args.concurrency)
+            result = await drive(client, args.endpoint, payloads, args.concurrency)
+            if args.workers == 1:
+                # With several workers each keeps its own counters, so a single snapshot would mislead
+                result['server_metrics'] = (await client.get('/metrics')).json()
+        result['startup_seconds'] = round(startup_seconds, 3)
+        server_rss = rss_mb(str(server.pid))
+        if server_rss is not None:
+            # Left out rather than reported as null where another process cannot be measured
+            result['server_rss_mb'] = server_rss
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def run_stages(args) -> dict:
+    """
+    Time each step of a request in isolation, without HTTP: validation, feature
+    building, model predict and JSON serialisation. Values are per request, in microseconds.
+    Validation starts from the raw body bytes, as the API receives them.
+    """
+    import app as api
+    from features import RAW_COLUMNS, build_features
+    from json_fastpath import FastJSONResponse, body_adapter, dumps
+
+    api.registry.refresh()
+    version = api.registry.active
+    rows = pd.read_csv(args.data).drop(columns=[TARGET_COLUMN]).to_dict('records')
+    timings = {'validation': [], 'features': [], 'predict': [], 'serialisation': []}
+
+    def timed(stage, fn, *fn_args):
+        started = time.perf_counter()
+        value = fn(*fn_args)
+        timings[stage].append(time.perf_counter() - started)
+        return value
+
+    if args.batch_size <= 1:
+        adapter = body_adapter(api.UserInput)
+        for i in range(args.stage_samples):
+            data = timed('validation', adapter.validate_json, dumps(rows[i % len(rows)]))
+            record = timed('features', api.feature_record, data)
+            prediction = timed('predict', version.predict_records, [record])[0]
+            timed('serialisation', lambda: FastJSONResponse(content={'predicted_category': prediction}).body)
+    else:
+        adapter = body_adapter(api.UserInput, many=True)
+        payloads = load_payloads(args.data, max(1, args.stage_samples // args.batch_size), args.batch_size)
+        for payload in map(dumps, payloads):
+            inputs = timed('validation', adapter.validate_json, payload)
+            features = timed('features', lambda: build_features(pd.DataFrame(
+                {column: [getattr(item, column) for item in inputs] for column in RAW_COLUMNS}
+            )))
+            predictions = timed('predict', version.predict_frame, features)
+            timed('serialisation', lambda: FastJSONResponse(content={'predicted_categories': predictions}).body)
+
+    per_request = max(1, args.batch_size)
+    stages = {}
+    for stage, values in timings.items():
+        us = np.asarray(values) * 1e6 / per_request
+        stages[stage] = {
+            'mean_us': round(float(us.mean()), 2),
+            'p50_us': round(float(np.percentile(us, 50)), 2),
+            'p99_us': round(float(np.percentile(us, 99)), 2),
+        }
+    stages['model'] = version.info()
+    return stages
+
+
+def environment() -> dict:
+    import sklearn
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def main(argv: list[str] = None) -> dict:
+    parser = argparse.ArgumentParser(description='Benchmark /predict latency and throughput.')
+    parser.add_argument('--mode', choices=['inprocess', 'uvicorn', 'both'], default='inprocess')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--warmup', type=int, default=50, help='Requests sent before measuring')
+    parser.add_argument('--batch-size', type=int, default=1, help='>1 benchmarks /predict/batch with this many applicants')
+    parser.add_argument('--stage-samples', type=int, default=500, help='Applicants used for the stage breakdown')
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes')
+    parser.add_argument('--startup-timeout', type=float, default=60.0)
+    parser.add_argument('--cache', action='store_true', help='Keep the prediction cache enabled')
+    parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+    args.endpoint = '/predict' if args.batch_size <= 1 else '/predict/batch'
+
+    if not args.cache:
+        # Must be set before the app is imported (and is inherited by the uvicorn server)
+        os.environ['PREDICTION_CACHE_MAX_BYTES'] = '0'
+
+    payloads = load_payloads(args.data, args.requests, args.batch_size)
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'environment': environment(),
+        'results': {},
+    }
+    if args.mode in ('inprocess', 'both'):
+        report['results']['inprocess'] = asyncio.run(run_inprocess(args, payloads))
+    if args.mode in ('uvicorn', 'both'):
+        report['results']['uvicorn'] = asyncio.run(run_uvicorn(args, payloads))
+    report['stages'] = run_stages(args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
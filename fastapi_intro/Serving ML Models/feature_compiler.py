@@ -0,0 +1,198 @@
+# Serving-time feature compiler: replaces the pandas + ColumnTransformer hot path
+#
+# The fitted preprocessor in model.pkl is read once and turned into a plain
+# mapping from every (column, category value) to its one-hot offset, plus the
+# offsets of passthrough numeric columns. Requests then fill a NumPy row
+# directly and go straight to the classifier.
+import threading
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+
+class CompiledFeaturizer:
+    """
+    Precomputed equivalent of a fitted Pipeline(preprocessor=ColumnTransformer, classifier=...).
+    Only supports the shape used by this project: OneHotEncoder columns plus passthrough columns.
+    The classifier can be any object with classes_, n_features_in_ and predict(matrix).
+    """
+
+    def __init__(self, category_offsets: dict[str, dict], numeric_offsets: dict[str, int], classifier):
+        self.category_offsets = category_offsets
+        self.numeric_offsets = numeric_offsets
+        self.classifier = classifier
+        self.classes_ = classifier.classes_
+        self.n_features = len(numeric_offsets) + sum(len(offsets) for offsets in category_offsets.values())
+        if self.n_features != classifier.n_features_in_:
+            raise ValueError('Compiled feature width does not match the classifier')
+        self._local = threading.local()
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> 'CompiledFeaturizer':
+        """
+        Read the one-hot and passthrough layout out of a fitted pipeline.
+        """
+        preprocessor = pipeline.named_steps['preprocessor']
+        category_offsets: dict[str, dict] = {}
+        numeric_offsets: dict[str, int] = {}
+
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if isinstance(transformer, str) and transformer == 'drop':
+                continue
+            if isinstance(transformer, OneHotEncoder):
+                if transformer.drop is not None or transformer.handle_unknown != 'error':
+                    raise ValueError('Only OneHotEncoder(drop=None, handle_unknown="error") can be compiled')
+                for column, categories in zip(columns, transformer.categories_):
+                    category_offsets[column] = {
+                        cls._key(value): offset + i for i, value in enumerate(categories)
+                    }
+                    offset += len(categories)
+            elif transformer == 'passthrough' or isinstance(transformer, FunctionTransformer) and transformer.func is None:
+                # A fitted 'passthrough' shows up as an identity FunctionTransformer
+                for column in columns:
+                    numeric_offsets[column] = offset
+                    offset += 1
+            else:
+                raise ValueError(f'Cannot compile transformer {name!r} of type {type(transformer).__name__}')
+
+        return cls(category_offsets, numeric_offsets, pipeline.named_steps['classifier'])
+
+    @staticmethod
+    def _key(value):
+        # NumPy scalars from the encoder become plain Python values for dict lookups
+        return value.item() if isinstance(value, np.generic) else value
+
+    def _row_buffer(self, n_rows: int) -> np.ndarray:
+        # Per-thread preallocated buffer, grown on demand and reused across requests
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape[0] < n_rows:
+            buffer = np.empty((max(n_rows, 32), self.n_features), dtype=np.float64)
+            self._local.buffer = buffer
+        matrix = buffer[:n_rows]
+        matrix.fill(0.0)
+        return matrix
+
+    def transform_records(self, records: list[dict]) -> np.ndarray:
+        """
+        Fill feature rows from dicts of derived features; used for small batches.
+        The returned array is a view into a reused buffer, valid until the next call on this thread.
+        """
+        matrix = self._row_buffer(len(records))
+        for row, record in zip(matrix, records):
+            for column, offsets in self.category_offsets.items():
+                try:
+                    row[offsets[record[column]]] = 1.0
+                except KeyError:
+                    raise ValueError(f'Found unknown category {record[column]!r} in column {column!r}')
+            for column, position in self.numeric_offsets.items():
+                row[position] = record[column]
+        return matrix
+
+    def transform_frame(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        Vectorised transform of a whole feature DataFrame.
+        """
+        n_rows = len(frame)
+        matrix = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        rows = np.arange(n_rows)
+        for column, offsets in self.category_offsets.items():
+            positions = frame[column].map(offsets)
+            if positions.isna().any():
+                unknown = frame[column][positions.isna()].iloc[0]
+                raise ValueError(f'Found unknown category {unknown!r} in column {column!r}')
+            matrix[rows, positions.to_numpy(dtype=np.int64)] = 1.0
+        for column, position in self.numeric_offsets.items():
+            matrix[:, position] = frame[column].to_numpy(dtype=np.float64)
+        return matrix
+
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        return self.classifier.predict(matrix)
+
+    def probe_frame(self) -> pd.DataFrame:
+        """
+        Feature frame covering every category combination, used to check parity with the pipeline.
+        """
+        columns = list(self.category_offsets)
+        combos = list(product(*(list(self.category_offsets[c]) for c in columns)))
+        rng = np.random.default_rng(0)
+        frame = pd.DataFrame(combos, columns=columns)
+        for column in self.numeric_offsets:
+            frame[column] = rng.uniform(10, 50, size=len(frame)).round(2)
+        return frame
+
+
+def pipeline_probe_frame(pipeline, n_rows: int = 64) -> pd.DataFrame:
+    """
+    Sample feature frame for a pipeline that could not be compiled, e.g. to warm it up.
+    One-hot columns cycle through the encoder's fitted categories_ and every other input
+    column gets numbers in the same range as probe_frame.
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    rng = np.random.default_rng(0)
+    columns: dict[str, list] = {}
+    for _, transformer, names in preprocessor.transformers_:
+        if isinstance(transformer, OneHotEncoder):
+            for column, categories in zip(names, transformer.categories_):
+                columns[column] = [CompiledFeaturizer._key(categories[i % len(categories)]) for i in range(n_rows)]
+    for column in preprocessor.feature_names_in_:
+        if column not in columns:
+            columns[column] = rng.uniform(10, 50, size=n_rows).round(2)
+    return pd.DataFrame({column: columns[column] for column in preprocessor.feature_names_in_})
+
+
+def compile_pipeline(pipeline, check_frame: pd.DataFrame = None) -> CompiledFeaturizer:
+    """
+    Compile a fitted pipeline and verify it predicts exactly like the original.
+    Raises ValueError if the pipeline cannot be compiled or the predictions differ.
+    """
+    compiled = CompiledFeaturizer.from_pipeline(pipeline)
+    frame = compiled.probe_frame() if check_frame is None else check_frame
+    expected = pipeline.predict(frame)
+    if not np.array_equal(compiled.predict(compiled.transform_frame(frame)), expected):
+        raise ValueError('Compiled featurizer predictions differ from the pipeline (frame transform)')
+    records = frame.to_dict('records')
+    actual = np.concatenate([
+        compiled.predict(compiled.transform_records(records[i:i + 32]))
+        for i in range(0, len(records), 32)
+    ])
+    if not np.array_equal(actual, expected):
+        raise ValueError('Compiled featurizer predictions differ from the pipeline (record transform)')
+    return compiled
+
+
+if __name__ == "__main__":
+    """
+    Parity check and single-request latency benchmark against the pandas pipeline.
+    Run from this directory: python feature_compiler.py
+    """
+    import pickle
+    import time
+
+    from features import FEATURE_COLUMNS, build_features
+
+    with open('model.pkl', 'rb') as f:
+        pipeline = pickle.load(f)
+    features = build_features(pd.read_csv('insurance.csv'))[FEATURE_COLUMNS]
+    compiled = compile_pipeline(pipeline, features)
+    print(f'Parity: identical predictions on {len(features)} rows of insurance.csv')
+
+    records = features.to_dict('records')
+    rounds = 5
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for record in records:
+            pipeline.predict(pd.DataFrame([record]))
+    pandas_ms = (time.perf_counter() - start) / (rounds * len(records)) * 1000
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for record in records:
+            compiled.predict(compiled.transform_records([record]))
+    compiled_ms = (time.perf_counter() - start) / (rounds * len(records)) * 1000
+
+    print(f'pandas pipeline : {pandas_ms:.3f} ms/request')
+    print(f'compiled        : {compiled_ms:.3f} ms/request ({pandas_ms / compiled_ms:.1f}x faster)')
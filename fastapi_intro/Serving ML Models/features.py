@@ -0,0 +1,127 @@
+# Feature engineering for the insurance premium model, computed column-wise
+import json
+import os
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+# City tier table shipped next to this module; point CITY_TIERS_FILE elsewhere to override it
+CITY_TIERS_FILE = os.environ.get(
+    'CITY_TIERS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'city_tiers.json')
+)
+
+
+def normalise_city(city: str) -> str:
+    """
+    Canonical lookup key for a city name: case-insensitive, surrounding and repeated spaces ignored.
+    """
+    return ' '.join(city.split()).casefold()
+
+
+class CityTierTable:
+    """
+    City name -> tier index with O(1) lookups, shared by training and serving.
+    Names and aliases are normalised once at load time; unknown cities get default_tier.
+    """
+
+    def __init__(self, tiers: dict[int, list[str]], aliases: dict[str, str], default_tier: int = 3):
+        self.default_tier = default_tier
+        self._tiers: dict[str, int] = {}
+        for tier, cities in tiers.items():
+            for city in cities:
+                self._tiers[normalise_city(city)] = int(tier)
+        for alias, city in aliases.items():
+            try:
+                self._tiers[normalise_city(alias)] = self._tiers[normalise_city(city)]
+            except KeyError:
+                raise ValueError(f'Alias {alias!r} points to unknown city {city!r}')
+
+        self._canonical = {
+            int(tier): frozenset(cities) for tier, cities in tiers.items()
+        }
+
+    @classmethod
+    def from_file(cls, path: str) -> 'CityTierTable':
+        with open(path, 'r') as f:
+            table = json.load(f)
+        return cls(table['tiers'], table.get('aliases', {}), table.get('default_tier', 3))
+
+    def lookup(self, city: str) -> int:
+        return self._tiers.get(normalise_city(city), self.default_tier)
+
+    def lookup_many(self, cities: pd.Series) -> np.ndarray:
+        """
+        Vectorised lookup: each distinct name is normalised once, then broadcast back by code.
+        """
+        codes, uniques = pd.factorize(cities)
+        tiers = np.array([self.lookup(city) for city in uniques] + [self.default_tier], dtype=np.int64)
+        # factorize marks missing values with -1, which picks the trailing default tier
+        return tiers[codes]
+
+    def cities(self, tier: int) -> frozenset:
+        """
+        Canonical (non-alias) city names listed for one tier.
+        """
+        return self._canonical.get(tier, frozenset())
+
+
+city_tiers = CityTierTable.from_file(CITY_TIERS_FILE)
+tier_1_cities = city_tiers.cities(1)
+tier_2_cities = city_tiers.cities(2)
+
+
+def city_tier(city: str) -> int:
+    return city_tiers.lookup(city)
+
+
+# Derived-feature rules, shared by training, /predict and /predict/batch
+AGE_GROUP_BOUNDS = (25, 45, 60)  # Exclusive upper bounds of every age group except the last
+AGE_GROUP_LABELS = ('young', 'adult', 'middle_aged', 'senior')
+HIGH_RISK_BMI = 30  # Smokers above this BMI are high risk
+MEDIUM_RISK_BMI = 27  # Anyone above this BMI (or any smoker) is at least medium risk
+
+
+def age_group(age: int) -> str:
+    return AGE_GROUP_LABELS[bisect_right(AGE_GROUP_BOUNDS, age)]
+
+
+def lifestyle_risk(smoker: bool, bmi: float) -> str:
+    if smoker and bmi > HIGH_RISK_BMI:
+        return 'high'
+    if smoker or bmi > MEDIUM_RISK_BMI:
+        return 'medium'
+    return 'low'
+
+
+# Raw applicant fields and the derived columns the model pipeline was trained on
+RAW_COLUMNS = ['age', 'weight', 'height', 'income_lpa', 'smoker', 'city', 'occupation']
+FEATURE_COLUMNS = ['bmi', 'age_group', 'lifestyle_risk', 'city_tier', 'income_lpa', 'occupation']
+
+
+def build_features(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derive the model's feature columns from raw applicant columns, applied to whole columns at once.
+    Uses the same rules as age_group() and lifestyle_risk(), which score single applicants.
+    """
+    age = raw['age'].to_numpy()
+    smoker = raw['smoker'].to_numpy(dtype=bool)
+    bmi = raw['weight'].to_numpy(dtype=np.float64) / raw['height'].to_numpy(dtype=np.float64) ** 2
+
+    # Few distinct ages, so the scalar rule runs once per age and is broadcast back
+    ages, inverse = np.unique(age, return_inverse=True)
+    age_groups = np.array([age_group(value) for value in ages.tolist()], dtype=object)[inverse.reshape(-1)]
+    lifestyle = np.select(
+        [smoker & (bmi > HIGH_RISK_BMI), smoker | (bmi > MEDIUM_RISK_BMI)],
+        ['high', 'medium'],
+        default='low',
+    ).astype(object)
+
+    return pd.DataFrame({
+        'bmi': bmi,
+        'age_group': age_groups,
+        'lifestyle_risk': lifestyle,
+        'city_tier': city_tiers.lookup_many(raw['city']),
+        'income_lpa': raw['income_lpa'].to_numpy(dtype=np.float64),
+        'occupation': raw['occupation'].to_numpy(dtype=object),
+    }, index=raw.index)
@@ -0,0 +1,172 @@
+# Memory-mapped model artifact: the random forest flattened into NumPy arrays
+#
+# A pickled forest has to be fully deserialised by every process, and sklearn copies
+# each tree's node arrays into private buffers on load, so even joblib's mmap_mode
+# cannot share them. This format stores all trees as a handful of flat .npy files
+# plus a JSON layout; loading memory-maps the arrays, which is near-instant and lets
+# every worker on a host share the same page-cache pages.
+#
+#   models/model-<version>.forest/
+#       layout.json      feature layout, classes, tree roots, depth
+#       feature.npy      int32   split feature per node (0 for leaves)
+#       threshold.npy    float64 split threshold per node
+#       children.npy     int32   (left, right) per node; leaves point at themselves
+#       value.npy        float64 per-node class probabilities
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from feature_compiler import CompiledFeaturizer, compile_pipeline
+
+FOREST_SUFFIX = '.forest'
+FOREST_ARRAYS = ('feature', 'threshold', 'children', 'value')
+# Rows scored per traversal; small blocks keep the (rows x trees) node arrays in cache
+PREDICT_CHUNK_ROWS = 512
+
+
+class PackedForest:
+    """
+    A fitted RandomForestClassifier as flat node arrays, scored by walking every tree at once.
+    Predicts exactly like sklearn: inputs are compared as float32, per-tree probabilities
+    are normalised and averaged in tree order.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray], roots: np.ndarray, classes: list, n_features: int, max_depth: int):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children = arrays['children']
+        # (left, right) pairs flattened so a step is one take() at 2 * node + went_right
+        self._children_flat = self.children.reshape(-1)
+        self.value = arrays['value']
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.classes_ = np.array(classes, dtype=object)
+        self.n_features_in_ = n_features
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_estimator(cls, forest) -> 'PackedForest':
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError('Only single-output forests can be packed')
+        counts = np.array([tree.node_count for tree in trees])
+        roots = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        total = int(counts.sum())
+        n_classes = len(forest.classes_)
+
+        feature = np.zeros(total, dtype=np.int32)
+        threshold = np.zeros(total, dtype=np.float64)
+        children = np.zeros((total, 2), dtype=np.int32)
+        value = np.zeros((total, n_classes), dtype=np.float64)
+        for tree, root in zip(trees, roots):
+            nodes = slice(root, root + tree.node_count)
+            index = np.arange(tree.node_count) + root
+            leaf = tree.children_left == -1
+            feature[nodes] = np.where(leaf, 0, tree.feature)
+            threshold[nodes] = np.where(leaf, 0.0, tree.threshold)
+            children[nodes, 0] = np.where(leaf, index, tree.children_left + root)
+            children[nodes, 1] = np.where(leaf, index, tree.children_right + root)
+            # Same normalisation sklearn applies to each tree's predict_proba
+            counts_by_class = tree.value[:, 0, :]
+            normaliser = counts_by_class.sum(axis=1)
+            normaliser[normaliser == 0.0] = 1.0
+            value[nodes] = counts_by_class / normaliser[:, np.newaxis]
+
+        arrays = {'feature': feature, 'threshold': threshold, 'children': children, 'value': value}
+        max_depth = max(tree.max_depth for tree in trees)
+        return cls(arrays, roots, forest.classes_.tolist(), int(forest.n_features_in_), int(max_depth))
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        # One step down every tree per iteration; leaves loop on themselves.
+        # Flat take() on raveled arrays is much cheaper than 2-D fancy indexing.
+        n_rows, n_features = X.shape
+        nodes = np.repeat(self.roots[np.newaxis, :], n_rows, axis=0)
+        row_offsets = (np.arange(n_rows) * n_features)[:, np.newaxis]
+        values = X.reshape(-1)
+        for _ in range(self.max_depth):
+            go_right = values.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            following = self._children_flat.take(2 * nodes + go_right)
+            if np.array_equal(following, nodes):
+                break
+            nodes = following
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        # sklearn trees split on float32 copies of the input
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        chunks = []
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            leaves = self._leaves(X[start:start + PREDICT_CHUNK_ROWS])
+            # (trees, rows, classes) summed over axis 0 adds the trees in order, as sklearn does
+            chunks.append(self.value[leaves.T].sum(axis=0) / len(self.roots))
+        return np.concatenate(chunks) if chunks else np.zeros((0, len(self.classes_)))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def export_forest(pipeline, path: str, check_frame: pd.DataFrame = None) -> str:
+    """
+    Write a fitted pipeline as a .forest directory, after checking it predicts exactly
+    like the pipeline. The directory is assembled under a temporary name and renamed
+    into place, so the model registry never sees a partial artifact.
+    """
+    if not path.endswith(FOREST_SUFFIX):
+        raise ValueError(f'Forest artifacts must end in {FOREST_SUFFIX!r}')
+    if os.path.exists(path):
+        raise FileExistsError(f'{path!r} already exists')
+
+    compiled = compile_pipeline(pipeline, check_frame)
+    forest = PackedForest.from_estimator(compiled.classifier)
+    frame = compiled.probe_frame() if check_frame is None else check_frame
+    if not np.array_equal(forest.predict(compiled.transform_frame(frame)), pipeline.predict(frame)):
+        raise ValueError('Packed forest predictions differ from the pipeline')
+
+    layout = {
+        'category_offsets': {
+            column: [[value, offset] for value, offset in offsets.items()]
+            for column, offsets in compiled.category_offsets.items()
+        },
+        'numeric_offsets': compiled.numeric_offsets,
+        'classes': forest.classes_.tolist(),
+        'n_features': forest.n_features_in_,
+        'max_depth': forest.max_depth,
+        'roots': forest.roots.tolist(),
+    }
+    tmp_path = f'{path}.tmp'
+    os.makedirs(tmp_path)
+    for name in FOREST_ARRAYS:
+        np.save(os.path.join(tmp_path, f'{name}.npy'), getattr(forest, name))
+    with open(os.path.join(tmp_path, 'layout.json'), 'w') as f:
+        json.dump(layout, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_forest(path: str) -> CompiledFeaturizer:
+    """
+    Memory-map a .forest directory into a ready-to-use compiled featurizer.
+    """
+    with open(os.path.join(path, 'layout.json'), 'r') as f:
+        layout = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in FOREST_ARRAYS}
+    forest = PackedForest(arrays, layout['roots'], layout['classes'], layout['n_features'], layout['max_depth'])
+    category_offsets = {
+        column: {value: offset for value, offset in pairs}
+        for column, pairs in layout['category_offsets'].items()
+    }
+    return CompiledFeaturizer(category_offsets, layout['numeric_offsets'], forest)
+
+
+if __name__ == "__main__":
+    """
+    Convert a pickled pipeline: python forest_artifact.py model.pkl models/model.forest
+    """
+    import pickle
+    import sys
+
+    source, target = sys.argv[1], sys.argv[2]
+    with open(source, 'rb') as f:
+        pipeline = pickle.load(f)
+    print(f'Wrote {export_forest(pipeline, target)}')
@@ -1,48 +1,199 @@
 import streamlit as st
 import requests
+import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-API_URL = "http://127.0.0.1:8000" 
+API_URL = "http://127.0.0.1:8000"
 
-st.title("Insurance Premium Category Predictor")
-st.markdown("Enter your details below:")
-
-# Input fields
-age = st.number_input("Age", min_value=1, max_value=119, value=30)
-weight = st.number_input("Weight (kg)", min_value=1.0, value=65.0)
-height = st.number_input("Height (m)", min_value=0.5, max_value=2.5, value=1.7)
-income_lpa = st.number_input("Annual Income (LPA)", min_value=0.1, value=10.0)
-smoker = st.selectbox("Are you a smoker?", options=[True, False])
-city = st.text_input("City", value="Mumbai")
-occupation = st.selectbox(
-    "Occupation",
-    ['retired', 'freelancer', 'student', 'government_job', 'business_owner', 'unemployed', 'private_job']
-)
-
-if st.button("Predict Premium Category"):
-    input_data = {
-        "age": age,
-        "weight": weight,
-        "height": height,
-        "income_lpa": income_lpa,
-        "smoker": smoker,
-        "city": city,
-        "occupation": occupation
-    }
+# bulk scoring settings: rows per /predict/batch call, calls in flight, retries per call
+BULK_CHUNK_ROWS = 500
+BULK_MAX_CONCURRENCY = 4
+BULK_RETRIES = 3
+BULK_TIMEOUT = (3.05, 60)
+REQUIRED_COLUMNS = ['age', 'weight', 'height', 'income_lpa', 'smoker', 'city', 'occupation']
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    Pooled session kept across Streamlit reruns, sized for the bulk scoring concurrency.
+    Prediction calls only score, so POSTs are safe to retry on throttling and gateway errors.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=BULK_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=['POST'],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=BULK_MAX_CONCURRENCY, max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
+def error_detail(response: requests.Response) -> str:
     try:
-        response = requests.post(API_URL + "/predict", json=input_data, timeout=10)
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx and 5xx)
-
-        result = response.json()
-        if "predicted_category" in result:
-            st.success(f"Predicted Insurance Premium Category: **{result['predicted_category']}**")
-        else:
-            st.error("Unexpected response format from the API.")
-            st.json(result)
-
-    except requests.exceptions.ConnectionError:
-        st.error("❌ Could not connect to the FastAPI server. Please ensure it is running.")
-    except requests.exceptions.Timeout:
-        st.error("⏳ The request timed out. Please try again later.")
-    except requests.exceptions.RequestException as e:
-        st.error(f"⚠️ An error occurred: {e}")
+        body = response.json()
+        return str(body.get('error') or body.get('detail') or body)
+    except ValueError:
+        return response.text
+
+def score_chunk(chunk: pd.DataFrame) -> tuple[list, list]:
+    """
+    Score one chunk of applicants with /predict/batch.
+    Rows rejected by validation get their error and the rest of the chunk is resent,
+    so one bad row does not fail its neighbours. Returns (predictions, errors) per row.
+    """
+    # NaN is not valid JSON; send missing cells as null so the API reports them per row
+    records = chunk.astype(object).where(chunk.notna(), None).to_dict('records')
+    predictions = [None] * len(records)
+    errors = [None] * len(records)
+    pending = list(range(len(records)))
+
+    while pending:
+        try:
+            response = get_session().post(
+                API_URL + "/predict/batch", json=[records[i] for i in pending], timeout=BULK_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            for i in pending:
+                errors[i] = f"Request failed: {e}"
+            break
+
+        if response.status_code == 200:
+            for i, prediction in zip(pending, response.json()['predicted_categories']):
+                predictions[i] = prediction
+            break
+
+        rejected: dict[int, list] = {}
+        if response.status_code == 422:
+            # FastAPI locates each validation error as ['body', <row>, <field>]
+            for error in response.json().get('detail', []):
+                loc = error.get('loc', [])
+                if len(loc) >= 2 and isinstance(loc[1], int) and loc[1] < len(pending):
+                    field = '.'.join(str(part) for part in loc[2:])
+                    rejected.setdefault(pending[loc[1]], []).append(f"{field}: {error.get('msg')}")
+        if not rejected:
+            for i in pending:
+                errors[i] = f"HTTP {response.status_code}: {error_detail(response)}"
+            break
+        for i, messages in rejected.items():
+            errors[i] = '; '.join(messages)
+        pending = [i for i in pending if i not in rejected]
+
+    return predictions, errors
+
+def score_csv(uploaded_file, progress) -> pd.DataFrame:
+    """
+    Read the upload a chunk at a time and score chunks concurrently, with at most
+    BULK_MAX_CONCURRENCY requests in flight. Returns the input rows plus the results.
+    """
+    total_rows = max(1, sum(1 for _ in uploaded_file) - 1)
+    uploaded_file.seek(0)
+
+    scored = {}
+    done_rows = 0
+
+    def collect(futures) -> None:
+        nonlocal done_rows
+        for future in futures:
+            index, chunk = in_flight.pop(future)
+            predictions, errors = future.result()
+            chunk = chunk.copy()
+            chunk['predicted_category'] = predictions
+            chunk['error'] = errors
+            scored[index] = chunk
+            done_rows += len(chunk)
+            progress.progress(min(done_rows / total_rows, 1.0), text=f"Scored {done_rows} of {total_rows} rows")
+
+    with ThreadPoolExecutor(max_workers=BULK_MAX_CONCURRENCY) as executor:
+        in_flight = {}
+        for index, chunk in enumerate(pd.read_csv(uploaded_file, chunksize=BULK_CHUNK_ROWS)):
+            missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+            in_flight[executor.submit(score_chunk, chunk[REQUIRED_COLUMNS])] = (index, chunk)
+            if len(in_flight) >= BULK_MAX_CONCURRENCY:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+        collect(list(in_flight))
+
+    if not scored:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS + ['predicted_category', 'error'])
+    return pd.concat([scored[index] for index in sorted(scored)], ignore_index=True)
+
+st.title("Insurance Premium Category Predictor")
+mode = st.radio("Mode", ["Single applicant", "Bulk CSV"], horizontal=True)
+
+if mode == "Single applicant":
+    st.markdown("Enter your details below:")
+
+    # Input fields
+    age = st.number_input("Age", min_value=1, max_value=119, value=30)
+    weight = st.number_input("Weight (kg)", min_value=1.0, value=65.0)
+    height = st.number_input("Height (m)", min_value=0.5, max_value=2.5, value=1.7)
+    income_lpa = st.number_input("Annual Income (LPA)", min_value=0.1, value=10.0)
+    smoker = st.selectbox("Are you a smoker?", options=[True, False])
+    city = st.text_input("City", value="Mumbai")
+    occupation = st.selectbox(
+        "Occupation",
+        ['retired', 'freelancer', 'student', 'government_job', 'business_owner', 'unemployed', 'private_job']
+    )
+
+    if st.button("Predict Premium Category"):
+        input_data = {
+            "age": age,
+            "weight": weight,
+            "height": height,
+            "income_lpa": income_lpa,
+            "smoker": smoker,
+            "city": city,
+            "occupation": occupation
+        }
+
+        try:
+            response = get_session().post(API_URL + "/predict", json=input_data, timeout=10)
+            response.raise_for_status()  # Raise HTTPError for bad responses (4xx and 5xx)
+
+            result = response.json()
+            if "predicted_category" in result:
+                st.success(f"Predicted Insurance Premium Category: **{result['predicted_category']}**")
+            else:
+                st.error("Unexpected response format from the API.")
+                st.json(result)
+
+        except requests.exceptions.ConnectionError:
+            st.error("❌ Could not connect to the FastAPI server. Please ensure it is running.")
+        except requests.exceptions.Timeout:
+            st.error("⏳ The request timed out. Please try again later.")
+        except requests.exceptions.RequestException as e:
+            st.error(f"⚠️ An error occurred: {e}")
+
+else:
+    st.markdown(f"Upload a CSV with the columns: `{', '.join(REQUIRED_COLUMNS)}` (extra columns are kept).")
+    uploaded_file = st.file_uploader("Applicants CSV", type="csv")
+
+    if uploaded_file is not None and st.button("Score File"):
+        progress = st.progress(0.0, text="Starting...")
+        try:
+            # Kept in session state so the download button's rerun does not lose the results
+            st.session_state["bulk_results"] = score_csv(uploaded_file, progress)
+            st.session_state["bulk_file_name"] = uploaded_file.name
+        except (ValueError, pd.errors.ParserError) as e:
+            st.error(f"⚠️ Could not read the CSV: {e}")
+
+    results = st.session_state.get("bulk_results")
+    if results is not None:
+        failed = int(results['error'].notna().sum())
+        st.success(f"Scored {len(results) - failed} of {len(results)} rows.")
+        if failed:
+            st.warning(f"{failed} rows could not be scored; see the error column.")
+        st.dataframe(results.head(100), use_container_width=True)
+        st.download_button(
+            "Download results CSV",
+            data=results.to_csv(index=False).encode(),
+            file_name=f"scored_{st.session_state.get('bulk_file_name', 'applicants.csv')}",
+            mime="text/csv",
+        )
@@ -0,0 +1,93 @@
+# Multi-process inference pool: CPU-bound scoring runs outside the API process's GIL
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import pandas as pd
+
+from model_registry import ModelVersion
+
+# Smallest slice of a large batch worth sending to its own worker
+MIN_CHUNK_ROWS = 256
+# Model versions kept loaded per worker (the active model plus a canary candidate)
+MAX_WORKER_VERSIONS = 2
+
+# Per-process model cache. Filled in the parent before the workers are forked so they
+# start with the active model already in memory, sharing its pages copy-on-write.
+_versions: dict[str, ModelVersion] = {}
+
+
+def _version_spec(version: ModelVersion) -> tuple:
+    # Small picklable description sent with every task instead of the model itself
+    return (version.key, version.name, version.path, version.stamp)
+
+
+def _worker_version(spec: tuple) -> ModelVersion:
+    key, name, path, stamp = spec
+    version = _versions.get(key)
+    if version is None:
+        # A version published after the fork: load it once in this worker
+        version = ModelVersion(name, path, stamp)
+        _versions[key] = version
+        while len(_versions) > MAX_WORKER_VERSIONS:
+            del _versions[next(iter(_versions))]
+    return version
+
+
+def _predict_records(spec: tuple, records: list[dict]) -> list:
+    return _worker_version(spec).predict_records(records)
+
+
+def _predict_frame(spec: tuple, features: pd.DataFrame) -> list:
+    return _worker_version(spec).predict_frame(features)
+
+
+def _ready() -> bool:
+    return True
+
+
+class InferencePool:
+    """
+    N worker processes that each hold the model and score batches sent over a queue.
+    Workers are forked from the API process after the model is loaded, so the model is
+    deserialised once and its memory shared instead of duplicated per worker.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self, preload: Optional[ModelVersion] = None) -> None:
+        """
+        Fork the workers. Call before starting other background threads.
+        """
+        if preload is not None:
+            _versions[preload.key] = preload
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+        # The first submit forks every worker while the preloaded model is in memory
+        self._executor.submit(_ready).result()
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def predict_records(self, version: ModelVersion, records: list[dict]) -> list:
+        """
+        Score one small batch on a worker process; blocks the calling thread until done.
+        """
+        return self._executor.submit(_predict_records, _version_spec(version), records).result()
+
+    def predict_frame(self, version: ModelVersion, features: pd.DataFrame) -> list:
+        """
+        Score a large batch, split across workers so it uses every core.
+        """
+        n_chunks = max(1, min(self.workers, len(features) // MIN_CHUNK_ROWS))
+        size = math.ceil(len(features) / n_chunks)
+        spec = _version_spec(version)
+        futures = [
+            self._executor.submit(_predict_frame, spec, features.iloc[start:start + size])
+            for start in range(0, len(features), size)
+        ]
+        return [prediction for future in futures for prediction in future.result()]
@@ -0,0 +1,242 @@
+# Versioned model registry with background hot reload and canary routing
+import glob
+import json
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import pandas as pd
+
+from feature_compiler import compile_pipeline, pipeline_probe_frame
+from forest_artifact import FOREST_SUFFIX, load_forest
+
+logger = logging.getLogger(__name__)
+
+
+class ModelVersion:
+    """
+    One loaded model: the sklearn pipeline plus its compiled feature path when available,
+    or for a .forest artifact just the memory-mapped compiled path (no pipeline).
+    Instances are immutable once published, so requests holding one are never disturbed
+    by a swap.
+    """
+
+    def __init__(self, name: str, path: str, stamp: tuple):
+        started = time.perf_counter()
+        self.name = name
+        self.path = path
+        self.stamp = stamp
+        if path.endswith(FOREST_SUFFIX):
+            self.pipeline = None
+            self.compiled = load_forest(path)
+        else:
+            with open(path, 'rb') as f:
+                self.pipeline = pickle.load(f)
+            try:
+                self.compiled = compile_pipeline(self.pipeline)
+            except ValueError as e:
+                logger.warning("Feature compiler disabled for model %s, using the sklearn pipeline: %s", name, e)
+                self.compiled = None
+        self.load_seconds = time.perf_counter() - started
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        self.metadata = self._read_metadata(path)
+
+    @staticmethod
+    def _read_metadata(path: str) -> dict:
+        # Training metadata written by train.py next to the model, e.g. models/model-<version>.json
+        metadata_path = os.path.splitext(path)[0] + '.json'
+        if not os.path.exists(metadata_path):
+            return {}
+        try:
+            with open(metadata_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable model metadata %s", metadata_path)
+            return {}
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies this exact artifact, e.g. for cache keys; changes if the file is rewritten.
+        """
+        return f'{self.name}@{self.stamp[0]}'
+
+    def predict_records(self, records: list[dict]) -> list:
+        if self.compiled is None:
+            return self.pipeline.predict(pd.DataFrame(records)).tolist()
+        return self.compiled.predict(self.compiled.transform_records(records)).tolist()
+
+    def predict_frame(self, features: pd.DataFrame) -> list:
+        if self.compiled is None:
+            return self.pipeline.predict(features).tolist()
+        return self.compiled.predict(self.compiled.transform_frame(features)).tolist()
+
+    def warm_up(self) -> None:
+        """
+        Run a sample batch through both prediction paths so the first real request is not cold.
+        Models that only have the sklearn pipeline are warmed with a frame built from its encoder.
+        """
+        if self.compiled is not None:
+            sample = self.compiled.probe_frame().head(64)
+        else:
+            sample = pipeline_probe_frame(self.pipeline)
+        self.predict_frame(sample)
+        self.predict_records(sample.to_dict('records')[:1])
+
+    def info(self) -> dict:
+        return {
+            'version': self.name,
+            'path': self.path,
+            'loaded_at': self.loaded_at,
+            'load_seconds': round(self.load_seconds, 4),
+            'format': 'forest' if self.pipeline is None else 'pickle',
+            'compiled': self.compiled is not None,
+            'trained_at': self.metadata.get('trained_at'),
+            'accuracy': self.metadata.get('accuracy'),
+        }
+
+
+class ModelRegistry:
+    """
+    Watches a models directory and keeps the newest model (*.pkl or *.forest) loaded.
+    New versions are loaded and warmed in a background thread, then swapped in with a
+    single reference assignment. With canary_percent > 0 a new version first becomes the
+    candidate and receives that share of traffic until promoted.
+    """
+
+    def __init__(
+        self,
+        model_dir: str = 'models',
+        fallback_path: str = 'model.pkl',
+        poll_interval: float = 5.0,
+        canary_percent: float = 0.0,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.model_dir = model_dir
+        self.fallback_path = fallback_path
+        self.poll_interval = poll_interval
+        self.canary_percent = canary_percent
+        self.on_change = on_change
+        self.active: Optional[ModelVersion] = None
+        self.candidate: Optional[ModelVersion] = None
+        # (path, stamp) of the newest file when it last failed to load; skipped until it changes
+        self._failed: Optional[tuple[str, tuple]] = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    # --------- Lifecycle ---------
+    def open(self) -> None:
+        """
+        Load the current model synchronously, then start watching for new versions.
+        """
+        self.refresh()
+        if self.active is None:
+            raise FileNotFoundError(f'No model found in {self.model_dir!r} or at {self.fallback_path!r}')
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._run, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    # --------- Routing ---------
+    def choose(self) -> ModelVersion:
+        """
+        Pick the model for one request (or one micro-batch), honouring the canary split.
+        """
+        candidate = self.candidate
+        if candidate is not None and random.random() * 100 < self.canary_percent:
+            return candidate
+        return self.active
+
+    def promote(self) -> ModelVersion:
+        """
+        Make the canary candidate the active model.
+        """
+        with self._refresh_lock:
+            if self.candidate is None:
+                raise ValueError('There is no candidate model to promote')
+            self.active, self.candidate = self.candidate, None
+        self._notify()
+        return self.active
+
+    def info(self) -> dict:
+        active, candidate = self.active, self.candidate
+        return {
+            'active': active.info() if active else None,
+            'candidate': candidate.info() if candidate else None,
+            'canary_percent': self.canary_percent if candidate else 0.0,
+        }
+
+    # --------- Discovery ---------
+    def refresh(self) -> None:
+        """
+        Load the newest model file if it is not already active or the candidate.
+        A file that fails to load raises once and is then ignored until it is rewritten.
+        """
+        with self._refresh_lock:
+            found = self._discover()
+            if found is None:
+                return
+            name, path, stamp = found
+            for current in (self.active, self.candidate):
+                if current is not None and (current.path, current.stamp) == (path, stamp):
+                    return
+            if self._failed == (path, stamp):
+                return
+
+            try:
+                version = ModelVersion(name, path, stamp)
+                version.warm_up()
+            except Exception:
+                self._failed = (path, stamp)
+                raise
+            self._failed = None
+            logger.info("Loaded model %s from %s in %.2fs", name, path, version.load_seconds)
+            if self.active is not None and self.canary_percent > 0:
+                self.candidate = version
+            else:
+                # Atomic reference swap; in-flight requests keep the version they already hold
+                self.active, self.candidate = version, None
+        self._notify()
+
+    def _discover(self) -> Optional[tuple[str, str, tuple]]:
+        paths = [
+            path
+            for pattern in ('*.pkl', f'*{FOREST_SUFFIX}')
+            for path in glob.glob(os.path.join(self.model_dir, pattern))
+        ]
+        if not paths and os.path.exists(self.fallback_path):
+            paths = [self.fallback_path]
+        if not paths:
+            return None
+        stamped = [(self._stamp(path), path) for path in paths]
+        stamp, path = max(stamped, key=lambda item: (item[0], item[1]))
+        return os.path.splitext(os.path.basename(path))[0], path, stamp
+
+    @staticmethod
+    def _stamp(path: str) -> tuple:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _notify(self) -> None:
+        if self.on_change is not None:
+            self.on_change()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # A bad artifact must not kill the watcher; the current model keeps serving
+                # and the artifact is logged once, not on every poll
+                logger.exception("Failed to load new model version")
@@ -0,0 +1,123 @@
+# LRU + TTL cache of predictions keyed on the derived model features
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Rough per-entry cost of the OrderedDict slot and the (value, expiry) tuple, in bytes
+ENTRY_OVERHEAD = 200
+
+
+class PredictionCache:
+    """
+    Bounded cache of model outputs.
+    Keys are a canonical hash of the model version and the six derived features,
+    optionally with BMI and income quantised so near-identical quotes share an entry.
+    The model registry clears the cache whenever the serving model changes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: float = 300.0,
+        bmi_step: Optional[float] = None,
+        income_step: Optional[float] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.bmi_step = bmi_step
+        self.income_step = income_step
+        self._entries: OrderedDict[bytes, tuple] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # --------- Keys ---------
+    @staticmethod
+    def _quantise(value: float, step: Optional[float]) -> float:
+        return value if step is None else round(round(value / step) * step, 10)
+
+    def key(self, features: dict, model_version: str) -> bytes:
+        """
+        Canonical digest of a feature dict; key order and float noise from quantisation do not matter.
+        """
+        canonical = [
+            model_version,
+            self._quantise(float(features['bmi']), self.bmi_step),
+            features['age_group'],
+            features['lifestyle_risk'],
+            int(features['city_tier']),
+            self._quantise(float(features['income_lpa']), self.income_step),
+            features['occupation'],
+        ]
+        return hashlib.blake2b(json.dumps(canonical).encode(), digest_size=16).digest()
+
+    # --------- Lookups ---------
+    def get(self, features: dict, model_version: str):
+        """
+        Return the cached prediction, or None on a miss.
+        """
+        if self.max_bytes <= 0:
+            return None
+        key = self.key(features, model_version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, features: dict, model_version: str, prediction) -> None:
+        if self.max_bytes <= 0:
+            return
+        key = self.key(features, model_version)
+        cost = self._cost(key, prediction)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (prediction, time.monotonic() + self.ttl)
+            self._bytes += cost
+            # Evict least recently used entries until back under the memory budget
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    # --------- Internals ---------
+    @staticmethod
+    def _cost(key: bytes, prediction) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(prediction) + ENTRY_OVERHEAD
+
+    def _remove(self, key: bytes) -> None:
+        prediction, _ = self._entries.pop(key)
+        self._bytes -= self._cost(key, prediction)
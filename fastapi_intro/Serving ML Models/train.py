@@ -0,0 +1,201 @@
+# Training pipeline for the insurance premium model, extracted from fastapi_ml_model.ipynb
+#
+# Uses the same feature code as the API (features.build_features), so training and
+# serving cannot drift apart. Large CSVs are read in chunks and reduced to the six
+# model features as they stream in.
+#
+# Run from this directory:
+#   python train.py --data insurance.csv --model-dir models [--format forest|pickle]
+import argparse
+import json
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from features import FEATURE_COLUMNS, RAW_COLUMNS, build_features
+from forest_artifact import FOREST_SUFFIX, export_forest
+
+TARGET_COLUMN = 'insurance_premium_category'
+CATEGORICAL_FEATURES = ['age_group', 'lifestyle_risk', 'occupation', 'city_tier']
+NUMERIC_FEATURES = ['bmi', 'income_lpa']
+
+# Raw column types, so chunks are parsed without per-chunk type inference
+RAW_DTYPES = {
+    'age': 'int64',
+    'weight': 'float64',
+    'height': 'float64',
+    'income_lpa': 'float64',
+    'smoker': 'bool',
+    'city': 'object',
+    'occupation': 'object',
+    TARGET_COLUMN: 'object',
+}
+
+
+def load_training_frame(path: str, chunk_size: int = 500_000) -> pd.DataFrame:
+    """
+    Read a CSV of raw applicants in chunks and return the model features plus the target.
+    Only the derived columns of each chunk are kept, so peak memory stays near one raw chunk.
+    Low-cardinality string columns are stored as categoricals.
+    """
+    parts = []
+    reader = pd.read_csv(
+        path,
+        usecols=RAW_COLUMNS + [TARGET_COLUMN],
+        dtype=RAW_DTYPES,
+        chunksize=chunk_size,
+    )
+    for chunk in reader:
+        features = build_features(chunk)[FEATURE_COLUMNS]
+        features[TARGET_COLUMN] = chunk[TARGET_COLUMN]
+        parts.append(features)
+    if not parts:
+        raise ValueError(f'No rows found in {path!r}')
+
+    frame = pd.concat(parts, ignore_index=True)
+    for column in ['age_group', 'lifestyle_risk', 'occupation', TARGET_COLUMN]:
+        frame[column] = frame[column].astype('category')
+    return frame
+
+
+def build_pipeline(n_estimators: int = 100, random_state: int = 42, n_jobs: int = -1) -> Pipeline:
+    """
+    The notebook's pipeline: one-hot categorical features, passthrough numeric features,
+    random forest on top. Trees are fitted on all cores.
+    """
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('cat', OneHotEncoder(), CATEGORICAL_FEATURES),
+            ('num', 'passthrough', NUMERIC_FEATURES),
+        ]
+    )
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', RandomForestClassifier(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)),
+    ])
+
+
+def train(
+    frame: pd.DataFrame,
+    test_size: float = 0.2,
+    split_seed: int = 1,
+    n_estimators: int = 100,
+    random_state: int = 42,
+    n_jobs: int = -1,
+) -> tuple[Pipeline, dict]:
+    """
+    Fit the pipeline on a train split and report hold-out metrics.
+    """
+    X = frame[FEATURE_COLUMNS]
+    y = frame[TARGET_COLUMN].astype(str)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=split_seed)
+
+    pipeline = build_pipeline(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)
+    started = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    # Serving scores one request at a time, so don't keep the fit-time thread count
+    pipeline.named_steps['classifier'].n_jobs = None
+
+    metrics = {
+        'rows': len(frame),
+        'train_rows': len(X_train),
+        'test_rows': len(X_test),
+        'accuracy': round(float(accuracy_score(y_test, pipeline.predict(X_test))), 4),
+        'fit_seconds': round(fit_seconds, 2),
+        'class_counts': y.value_counts().to_dict(),
+    }
+    return pipeline, metrics
+
+
+def save_model(
+    pipeline: Pipeline,
+    model_dir: str,
+    metadata: dict,
+    version: str = None,
+    artifact_format: str = 'forest',
+) -> str:
+    """
+    Write model-<version>.forest (memory-mapped arrays, see forest_artifact.py) or
+    model-<version>.pkl, plus a model-<version>.json metadata sidecar, into model_dir.
+    Artifacts are written under a temporary name and renamed into place, so the model
+    registry never picks up a half-written file. Returns the model path.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    version = version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    metadata_path = os.path.join(model_dir, f'model-{version}.json')
+
+    # Metadata first: by the time the model file appears its sidecar is already there
+    with open(metadata_path, 'w') as f:
+        json.dump({'version': f'model-{version}', 'format': artifact_format, **metadata}, f, indent=2)
+
+    if artifact_format == 'forest':
+        return export_forest(pipeline, os.path.join(model_dir, f'model-{version}{FOREST_SUFFIX}'))
+
+    model_path = os.path.join(model_dir, f'model-{version}.pkl')
+
+    # The temporary name must not end in .pkl, or the registry could load it mid-write
+    tmp_path = f'{model_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(pipeline, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, model_path)
+    return model_path
+
+
+def main(argv: list[str] = None) -> str:
+    parser = argparse.ArgumentParser(description='Train the insurance premium model and publish a new version.')
+    parser.add_argument('--data', default='insurance.csv', help='CSV with raw applicant columns and the target')
+    parser.add_argument('--model-dir', default=os.environ.get('MODEL_DIR', 'models'), help='Directory the API watches for models')
+    parser.add_argument('--version', default=None, help='Version label (default: UTC timestamp)')
+    parser.add_argument('--format', choices=['forest', 'pickle'], default='forest', help='Model artifact format')
+    parser.add_argument('--chunk-size', type=int, default=500_000, help='Rows per CSV chunk')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Cores used to fit the forest (-1 = all)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    frame = load_training_frame(args.data, chunk_size=args.chunk_size)
+    load_seconds = time.perf_counter() - started
+    print(f'Loaded {len(frame)} rows from {args.data} in {load_seconds:.2f}s')
+
+    pipeline, metrics = train(
+        frame,
+        test_size=args.test_size,
+        n_estimators=args.n_estimators,
+        random_state=args.random_state,
+        n_jobs=args.n_jobs,
+    )
+    print(f"Fitted in {metrics['fit_seconds']}s, hold-out accuracy {metrics['accuracy']}")
+
+    metadata = {
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+        'data': os.path.abspath(args.data),
+        'load_seconds': round(load_seconds, 2),
+        'features': FEATURE_COLUMNS,
+        'params': {'n_estimators': args.n_estimators, 'random_state': args.random_state, 'test_size': args.test_size},
+        'sklearn_version': sklearn.__version__,
+        'pandas_version': pd.__version__,
+        **metrics,
+    }
+    model_path = save_model(pipeline, args.model_dir, metadata, version=args.version, artifact_format=args.format)
+    print(f'Wrote {model_path}')
+    return model_path
+
+
+if __name__ == "__main__":
+    main()